@@ -84,8 +84,8 @@ def train_model(input_data: Input[Dataset], output_model: Output[Model]):
         
         tx_agg = transactions_df.groupby('user_id').agg({
             'amount': ['count', 'mean', 'std', 'max', 'sum'],
-            'merchant_name': pd.Series.nunique,
-            'merchant_category': pd.Series.nunique
+            'merchant_name': 'nunique',
+            'merchant_category': 'nunique'
         })
         
         tx_agg.columns = ['_'.join(col) if isinstance(col, tuple) else col for col in tx_agg.columns]
@@ -130,23 +130,19 @@ def train_model(input_data: Input[Dataset], output_model: Output[Model]):
         return df
     
     def generate_labels_from_real_data(user_features, user_alerts_df, alert_types):
-        pivot = user_alerts_df.pivot_table(
-            index='user_id',
-            columns='alert_type',
-            values='enabled',
-            fill_value=0,
-            aggfunc='max'
+        pivot = (
+            user_alerts_df['enabled'].astype('int8')
+            .groupby([user_alerts_df['user_id'], user_alerts_df['alert_type']], sort=False)
+            .max()
+            .unstack(fill_value=0)
         )
         pivot.columns = [f'alert_{col}' if not col.startswith('alert_') else col for col in pivot.columns]
         pivot = pivot.reset_index()
         
         result = user_features.merge(pivot, on='user_id', how='left')
         
-        for alert_type in alert_types:
-            if alert_type in result.columns:
-                result[alert_type] = result[alert_type].fillna(0).astype(int)
-            else:
-                result[alert_type] = 0
+        # reindex adds any alert type nobody has enabled; labels are 0/1 so int8 suffices
+        result[alert_types] = result.reindex(columns=alert_types).fillna(0).astype('int8')
         
         return result
     
@@ -2,14 +2,16 @@
 JWT Authentication middleware for Keycloak integration using python-jose
 """
 
+import asyncio
 from datetime import datetime, timedelta
 import logging
+import time
 
 from fastapi import Depends, HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 import requests
-from sqlalchemy import select
+from sqlalchemy import Row, bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import settings
@@ -17,10 +19,12 @@ from ..core.config import settings
 # Optional database imports (for development mode user fetching)
 try:
     from db import get_db
+    from db.database import SessionLocal
     from db.models import User
 except ImportError:
     # DB package not available during some local dev flows
     get_db = None  # type: ignore
+    SessionLocal = None  # type: ignore
     User = None  # type: ignore
 
 # Location services import
@@ -32,6 +36,13 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Dev-mode email lookup, built once and bound per call
+_LOOKUP_BY_EMAIL_STMT = (
+    select(User.id, User.email).where(User.email == bindparam('email')).limit(1)
+    if User
+    else None
+)
+
 # Global cache for OIDC configuration and keys
 _oidc_config_cache: dict | None = None
 _jwks_cache: dict | None = None
@@ -55,8 +66,55 @@ async def _capture_user_location_safe(
         pass
 
 
+# Background location captures: at most this many are in flight, extra
+# requests skip the update rather than queueing behind them
+MAX_CONCURRENT_LOCATION_CAPTURES = 32
+_location_capture_tasks: set[asyncio.Task] = set()
+
+
+async def _capture_user_location_deferred(request: Request, user: dict) -> None:
+    """Capture user location in its own session, outliving the request's session"""
+    async with SessionLocal() as session:
+        await _capture_user_location_safe(request, user, session)
+
+
+def _schedule_location_capture(
+    request: Request, user: dict, headers: dict[str, str]
+) -> None:
+    """
+    Capture user location off the request path
+    Skips requests without location headers and drops captures when too many are in flight
+    """
+    if not update_user_location_on_login or not SessionLocal:
+        return
+    if not headers.get('x-user-latitude'):
+        return
+    if len(_location_capture_tasks) >= MAX_CONCURRENT_LOCATION_CAPTURES:
+        logger.debug('Too many location captures in flight, skipping update')
+        return
+
+    task = asyncio.create_task(_capture_user_location_deferred(request, user))
+    _location_capture_tasks.add(task)
+    task.add_done_callback(_location_capture_tasks.discard)
+
+
+def _request_headers(request: Request) -> dict[str, str]:
+    """
+    Map lower-case header names to values in one pass over the raw headers
+    The first occurrence of a repeated header wins, as with request.headers.get
+    """
+    return {
+        name.decode('latin-1'): value.decode('latin-1')
+        for name, value in reversed(request.headers.raw)
+    }
+
+
 _cache_expiry: datetime | None = None
 
+# Dev fallback user cache: (monotonic timestamp, user context)
+_BYPASS_USER_CACHE: tuple[float, dict] | None = None
+BYPASS_USER_CACHE_TTL_SECONDS = 60
+
 # Keycloak configuration (loaded from environment variables)
 KEYCLOAK_URL = settings.KEYCLOAK_URL  # Internal URL for API to reach Keycloak
 KEYCLOAK_FRONTEND_URL = (
@@ -253,21 +311,21 @@ class KeycloakJWTBearer:
 keycloak_jwt = KeycloakJWTBearer()
 
 
-async def lookup_user_by_email(email: str, session: AsyncSession) -> 'User | None':
-    """Lookup user by email in database (dev mode helper)"""
+async def lookup_user_by_email(email: str, session: AsyncSession) -> Row | None:
+    """Lookup user id and email by email in database (dev mode helper)"""
     if not User or not session:
         return None
 
     try:
-        result = await session.execute(select(User).where(User.email == email))
-        return result.scalar_one_or_none()
+        result = await session.execute(_LOOKUP_BY_EMAIL_STMT, {'email': email})
+        return result.first()
     except Exception as e:
         logger.error(f'Failed to lookup user by email {email}: {e}')
         return None
 
 
-def create_user_context(db_user: 'User', is_dev_mode: bool = False) -> dict:
-    """Create standardized user context from database user"""
+def create_user_context(db_user: 'User | Row', is_dev_mode: bool = False) -> dict:
+    """Create standardized user context from a database user or id/email row"""
     return {
         'id': db_user.id,
         'email': db_user.email,
@@ -303,19 +361,53 @@ async def get_test_user(email: str, session: AsyncSession) -> dict:
     return create_user_context(user, is_dev_mode=True)
 
 
+# Mock dev user, built once and shared read-only by every fallback request
+_DEV_MOCK_USER = {
+    'id': 'dev-user-123',
+    'email': 'developer@example.com',
+    'username': 'developer',
+    'roles': ['user', 'admin'],
+    'is_dev_mode': True,
+    'token_claims': {
+        'sub': 'dev-user-123',
+        'preferred_username': 'developer',
+        'email': 'developer@example.com',
+        'realm_access': {'roles': ['user', 'admin']},
+    },
+}
+
+
+def _reset_bypass_cache() -> None:
+    """Forget the cached dev fallback user"""
+    global _BYPASS_USER_CACHE
+    _BYPASS_USER_CACHE = None
+
+
 async def get_dev_fallback_user(session: AsyncSession) -> dict:
     """Get fallback dev user (first user or mock) - current behavior"""
+    global _BYPASS_USER_CACHE
+
     # Try to get first user from database (ordered by ID for consistency)
     if session and User:
+        if (
+            _BYPASS_USER_CACHE
+            and time.monotonic() - _BYPASS_USER_CACHE[0] < BYPASS_USER_CACHE_TTL_SECONDS
+        ):
+            return _BYPASS_USER_CACHE[1]
+
         try:
-            result = await session.execute(select(User).order_by(User.id).limit(1))
-            db_user = result.scalar_one_or_none()
+            result = await session.execute(
+                select(User.id, User.email).order_by(User.id).limit(1)
+            )
+            db_user = result.first()
 
             if db_user:
                 logger.info(
                     f'🔓 DEV MODE: Using first database user: {db_user.email} (ID: {db_user.id})'
                 )
-                return create_user_context(db_user, is_dev_mode=True)
+                user = create_user_context(db_user, is_dev_mode=True)
+                _BYPASS_USER_CACHE = (time.monotonic(), user)
+                return user
             else:
                 logger.warning(
                     '🔓 DEV MODE: No users found in database, using mock user'
@@ -327,19 +419,7 @@ async def get_dev_fallback_user(session: AsyncSession) -> dict:
 
     # Fallback to mock user if database unavailable or no users found
     logger.info('🔓 DEV MODE: Using mock fallback user')
-    return {
-        'id': 'dev-user-123',
-        'email': 'developer@example.com',
-        'username': 'developer',
-        'roles': ['user', 'admin'],
-        'is_dev_mode': True,
-        'token_claims': {
-            'sub': 'dev-user-123',
-            'preferred_username': 'developer',
-            'email': 'developer@example.com',
-            'realm_access': {'roles': ['user', 'admin']},
-        },
-    }
+    return _DEV_MOCK_USER
 
 
 async def get_current_user(
@@ -359,7 +439,7 @@ async def get_current_user(
 
         # NEW: Check for test user header (only if request is available)
         if request is not None:
-            test_user_email = request.headers.get('X-Test-User-Email')
+            test_user_email = _request_headers(request).get('x-test-user-email')
             if test_user_email:
                 return await get_test_user(test_user_email, session)
 
@@ -442,12 +522,14 @@ async def require_authentication(
 ) -> dict:
     """Require valid JWT token with development bypass"""
 
+    headers = _request_headers(request) if request else {}
+
     # Enhanced logging for debugging
     if request:
         logger.info(
             f'🔐 require_authentication called: {request.method} {request.url.path}'
         )
-        auth_header = request.headers.get('authorization', 'NOT PRESENT')
+        auth_header = headers.get('authorization', 'NOT PRESENT')
         logger.info(
             f'   Authorization header: {auth_header[:50] if auth_header != "NOT PRESENT" else auth_header}...'
         )
@@ -461,7 +543,7 @@ async def require_authentication(
 
         # NEW: Check for test user header (only if request is available)
         if request is not None:
-            test_user_email = request.headers.get('X-Test-User-Email')
+            test_user_email = headers.get('x-test-user-email')
             if test_user_email:
                 return await get_test_user(test_user_email, session)
             else:
@@ -475,7 +557,7 @@ async def require_authentication(
         if request:
             logger.error(f'   Request method: {request.method}')
             logger.error(f'   Request path: {request.url.path}')
-            logger.error(f'   All headers: {dict(request.headers)}')
+            logger.error(f'   All headers: {headers}')
         raise HTTPException(
             status_code=401,
             detail='Authentication required',
@@ -492,9 +574,9 @@ async def require_authentication(
         f'✅ Authentication successful for user: {user.get("email", "unknown")} (ID: {user.get("id", "unknown")})'
     )
 
-    # Capture user location on successful authentication
-    if request and session:
-        await _capture_user_location_safe(request, user, session)
+    # Capture user location on successful authentication without waiting for it
+    if request:
+        _schedule_location_capture(request, user, headers)
 
     return user
 
@@ -17,6 +17,8 @@ from .routes import users as users_routes
 from .services.alerts.alert_job_queue import alert_job_queue
 from .services.ml_startup import initialize_ml_system
 from .services.recommendations.llm_thread_pool import llm_thread_pool
+from .services.recommendations.ml.training import stop_retrain_worker
+from .services.recommendations.ml_inference_client import close_inference_client
 from .services.recommendations.recommendation_job_queue import (
     recommendation_job_queue,
 )
@@ -64,6 +66,9 @@ async def lifespan(app: FastAPI):
 
     await llm_thread_pool.stop()
     logger.info('LLM thread pool stopped')
+
+    await close_inference_client()
+    await stop_retrain_worker()
     logger.info('Shutting down application...')
 
 
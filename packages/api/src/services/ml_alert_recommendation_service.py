@@ -8,15 +8,15 @@ from datetime import datetime, timedelta
 from typing import Any
 
 import pandas as pd
-from sqlalchemy import and_, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models import AlertRule, Transaction, User
 from src.services.recommendations.ml import AlertRecommenderModel
 from src.services.recommendations.ml.feature_engineering import (
+    apply_alert_labels,
     build_user_features,
-    extract_alert_types_from_rules,
-    get_alert_columns,
+    extract_alert_labels_by_user,
 )
 from src.services.recommendations.ml.training import retrain_model, should_retrain_model
 from src.services.transactions.transaction_service import TransactionService
@@ -166,43 +166,19 @@ class MLAlertRecommendationService:
         self, user_features: pd.DataFrame, session: AsyncSession
     ) -> pd.DataFrame:
         """Add alert labels based on existing user alert rules"""
-        # Initialize all alert columns with 0
-        for alert_col in get_alert_columns():
-            if alert_col not in user_features.columns:
-                user_features[alert_col] = 0
-
-        # Get all users and their alert rules
-        users_result = await session.execute(select(User))
-        users = users_result.scalars().all()
-
-        for user in users:
-            rules_result = await session.execute(
-                select(AlertRule).where(
-                    and_(AlertRule.user_id == user.id, AlertRule.is_active)
-                )
+        # Project only the columns label extraction reads, for all users at once
+        rules_result = await session.execute(
+            select(AlertRule.user_id, AlertRule.natural_language_query).where(
+                AlertRule.is_active
             )
-            alert_rules = rules_result.scalars().all()
-
-            # Extract alert types
-            alert_types = extract_alert_types_from_rules(
-                [
-                    {
-                        'id': rule.id,
-                        'name': rule.name,
-                        'natural_language_query': rule.natural_language_query,
-                        'description': rule.description,
-                    }
-                    for rule in alert_rules
-                ]
+        )
+        alert_labels = extract_alert_labels_by_user(
+            pd.DataFrame.from_records(
+                rules_result.all(), columns=['user_id', 'natural_language_query']
             )
+        )
 
-            # Update user features with alert labels
-            user_mask = user_features['user_id'] == user.id
-            for alert_type, enabled in alert_types.items():
-                if alert_type in user_features.columns:
-                    user_features.loc[user_mask, alert_type] = enabled
-
-        return user_features
+        return apply_alert_labels(user_features, alert_labels)
 
     async def _add_user_to_features(
         self, user_id: str, user_features_df: pd.DataFrame, session: AsyncSession
@@ -380,6 +380,7 @@ class BackgroundRecommendationService:
                         # Use OpenShift AI inference endpoint
                         from src.services.recommendations.ml_inference_client import (
                             get_inference_client,
+                            run_inference_sync,
                         )
 
                         try:
@@ -412,20 +413,15 @@ class BackgroundRecommendationService:
                                     if col in user_row.columns
                                 }
 
-                                # Call inference service (run async function in sync context)
-                                loop = asyncio.new_event_loop()
-                                asyncio.set_event_loop(loop)
-                                try:
-                                    cf_result = loop.run_until_complete(
-                                        inference_client.get_recommendations(
-                                            user_features=user_features_dict,
-                                            user_id=user_id,
-                                            k_neighbors=5,
-                                            threshold=0.3,
-                                        )
+                                # Call inference service on its shared background loop
+                                cf_result = run_inference_sync(
+                                    inference_client.get_recommendations(
+                                        user_features=user_features_dict,
+                                        user_id=user_id,
+                                        k_neighbors=5,
+                                        threshold=0.3,
                                     )
-                                finally:
-                                    loop.close()
+                                )
 
                                 collaborative_recs = self._format_ml_recommendations(
                                     cf_result.get('recommendations', [])
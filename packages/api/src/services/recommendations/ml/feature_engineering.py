@@ -11,11 +11,32 @@ Based on user transaction history and profile data, we build
 feature vectors that capture spending patterns and behavior.
 """
 
+import re
 from typing import Any
 
 import numpy as np
 import pandas as pd
 
+# Keywords in a rule's natural language query that identify each alert type
+_ALERT_KEYWORDS = {
+    'alert_high_spender': ['spending', 'spent', 'spend over', 'total spend'],
+    'alert_high_tx_volume': [
+        'transaction count',
+        'number of transactions',
+        'frequent',
+    ],
+    'alert_high_merchant_diversity': ['different merchant', 'variety', 'diverse'],
+    'alert_near_credit_limit': ['credit limit', 'balance', 'utilization'],
+    'alert_large_transaction': ['large', 'big purchase', 'amount over', 'exceeds'],
+    'alert_new_merchant': ['new merchant', 'unfamiliar', 'first time'],
+    'alert_location_based': ['location', 'out of state', 'international', 'travel'],
+    'alert_subscription_monitoring': [
+        'subscription',
+        'recurring',
+        'monthly charge',
+    ],
+}
+
 
 def build_user_features(
     users_df: pd.DataFrame, transactions_df: pd.DataFrame
@@ -43,8 +64,8 @@ def build_user_features(
     tx_agg = transactions_df.groupby('user_id').agg(
         {
             'amount': ['count', 'mean', 'std', 'max', 'sum'],
-            'merchant_name': pd.Series.nunique,
-            'merchant_category': pd.Series.nunique,
+            'merchant_name': 'nunique',
+            'merchant_category': 'nunique',
         }
     )
 
@@ -186,40 +207,6 @@ def generate_initial_alert_labels(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def merge_real_alert_labels(
-    user_feature_df: pd.DataFrame, user_alerts_df: pd.DataFrame
-) -> pd.DataFrame:
-    """
-    Replace heuristic labels with real labels from user_alerts table.
-
-    Args:
-        user_feature_df: DataFrame with user features
-        user_alerts_df: DataFrame with columns: user_id, alert_type, enabled (0/1)
-
-    Returns:
-        DataFrame with merged real alert labels
-    """
-    # Pivot user alerts to create alert type columns
-    pivot = user_alerts_df.pivot_table(
-        index='user_id',
-        columns='alert_type',
-        values='enabled',
-        fill_value=0,
-        aggfunc='max',  # Take max in case of duplicates
-    )
-
-    # Add 'alert_' prefix to column names if not already present
-    pivot.columns = [
-        f'alert_{col}' if not col.startswith('alert_') else col for col in pivot.columns
-    ]
-    pivot = pivot.reset_index()
-
-    # Merge with user features
-    merged = user_feature_df.merge(pivot, on='user_id', how='left').fillna(0)
-
-    return merged
-
-
 def extract_alert_types_from_rules(alert_rules: list[dict[str, Any]]) -> dict[str, int]:
     """
     Extract alert types from user's active alert rules.
@@ -242,36 +229,69 @@ def extract_alert_types_from_rules(alert_rules: list[dict[str, Any]]) -> dict[st
         'alert_subscription_monitoring': 0,
     }
 
-    # Keywords to identify alert types
-    keyword_mapping = {
-        'alert_high_spender': ['spending', 'spent', 'spend over', 'total spend'],
-        'alert_high_tx_volume': [
-            'transaction count',
-            'number of transactions',
-            'frequent',
-        ],
-        'alert_high_merchant_diversity': ['different merchant', 'variety', 'diverse'],
-        'alert_near_credit_limit': ['credit limit', 'balance', 'utilization'],
-        'alert_large_transaction': ['large', 'big purchase', 'amount over', 'exceeds'],
-        'alert_new_merchant': ['new merchant', 'unfamiliar', 'first time'],
-        'alert_location_based': ['location', 'out of state', 'international', 'travel'],
-        'alert_subscription_monitoring': [
-            'subscription',
-            'recurring',
-            'monthly charge',
-        ],
-    }
-
     for rule in alert_rules:
         query = rule.get('natural_language_query', '').lower()
 
-        for alert_type, keywords in keyword_mapping.items():
+        for alert_type, keywords in _ALERT_KEYWORDS.items():
             if any(keyword in query for keyword in keywords):
                 alert_types[alert_type] = 1
 
     return alert_types
 
 
+def extract_alert_labels_by_user(alert_rules_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Extract alert type labels for many users at once.
+    Vectorized equivalent of extract_alert_types_from_rules applied per user.
+
+    Args:
+        alert_rules_df: DataFrame with columns: user_id, natural_language_query
+
+    Returns:
+        DataFrame with one row per user_id and a 0/1 column per alert type
+    """
+    queries = alert_rules_df['natural_language_query'].fillna('').str.lower()
+
+    matches = pd.DataFrame(
+        {
+            alert_type: queries.str.contains(
+                '|'.join(re.escape(keyword) for keyword in keywords)
+            )
+            for alert_type, keywords in _ALERT_KEYWORDS.items()
+        }
+    )
+    matches['user_id'] = alert_rules_df['user_id'].to_numpy()
+
+    labels = matches.groupby('user_id', sort=False).max().astype(int)
+    return labels.reset_index()
+
+
+def apply_alert_labels(
+    user_feature_df: pd.DataFrame, alert_labels: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Set every user's alert columns from per-user labels.
+
+    Labels are written straight into each user's row position; users without
+    labels get 0 for every alert type.
+
+    Args:
+        user_feature_df: DataFrame with user features
+        alert_labels: DataFrame from extract_alert_labels_by_user
+
+    Returns:
+        DataFrame with one 0/1 column per alert type
+    """
+    alert_cols = get_alert_columns()
+    rows = pd.Index(user_feature_df['user_id']).get_indexer(alert_labels['user_id'])
+    matched = rows >= 0
+
+    labels = np.zeros((len(user_feature_df), len(alert_cols)), dtype=np.int8)
+    labels[rows[matched]] = alert_labels[alert_cols].to_numpy()[matched]
+
+    return user_feature_df.assign(**dict(zip(alert_cols, labels.T, strict=True)))
+
+
 def get_alert_columns() -> list[str]:
     """Get list of all possible alert column names"""
     return [
@@ -6,6 +6,8 @@ with personalized thresholds. It follows the same pattern as LLM recommendations
 but uses rule-based ML logic instead of language models.
 """
 
+from collections.abc import Callable
+import heapq
 import logging
 from typing import Any
 
@@ -30,8 +32,6 @@ def generate_transaction_based_recommendations(
         list: Alert recommendations with personalized thresholds
     """
 
-    recommendations = []
-
     # If no transactions, return new user recommendations
     if transaction_analysis['total_transactions'] == 0:
         return _generate_new_user_recommendations(user_profile)
@@ -43,35 +43,33 @@ def generate_transaction_based_recommendations(
     temporal = transaction_analysis['temporal_patterns']
     thresholds = transaction_analysis['anomaly_thresholds']
 
+    # Candidates only carry what is needed to rank them; the user-facing
+    # text is rendered afterwards for the recommendations that are kept.
+    candidates = []
+
     # 1. Large transaction alert (based on user's own spending)
     if spending['mean'] > 0:
-        large_tx_threshold = thresholds['single_transaction']
-        recommendations.append(
+        candidates.append(
             {
-                'title': 'Large Transaction Alert',
-                'description': f'Get notified when a single transaction exceeds ${large_tx_threshold:.2f}',
-                'natural_language_query': f'Notify me when a single transaction exceeds ${large_tx_threshold:.2f}',
-                'category': 'fraud_protection',
-                'priority': 'high',
-                'reasoning': f'Based on your spending history (avg: ${spending["mean"]:.2f}), transactions over ${large_tx_threshold:.2f} are unusual',
-                'threshold_amount': large_tx_threshold,
+                'key': 'large_transaction',
                 'confidence': 0.9,
+                'params': {
+                    'threshold': thresholds['single_transaction'],
+                    'mean': spending['mean'],
+                },
             }
         )
 
     # 2. Weekly spending threshold (based on user's patterns)
     if temporal['avg_weekly_spending'] > 0:
-        weekly_threshold = thresholds['weekly_spending']
-        recommendations.append(
+        candidates.append(
             {
-                'title': 'Weekly Spending Limit Alert',
-                'description': f'Get alerted when weekly spending exceeds ${weekly_threshold:.2f}',
-                'natural_language_query': f'Notify me when my weekly spending exceeds ${weekly_threshold:.2f}',
-                'category': 'spending_threshold',
-                'priority': 'high',
-                'reasoning': f'You typically spend ${temporal["avg_weekly_spending"]:.2f}/week. This helps catch unusual spending spikes.',
-                'threshold_amount': weekly_threshold,
+                'key': 'weekly_spending',
                 'confidence': 0.85,
+                'params': {
+                    'threshold': thresholds['weekly_spending'],
+                    'avg_weekly_spending': temporal['avg_weekly_spending'],
+                },
             }
         )
 
@@ -81,39 +79,29 @@ def generate_transaction_based_recommendations(
         list(top_categories_data.items())[:2]
     ):  # Top 2 categories
         if category in thresholds['category_thresholds']:
-            cat_threshold = thresholds['category_thresholds'][category]
-            priority = 'high' if idx == 0 else 'medium'
-
-            recommendations.append(
+            candidates.append(
                 {
-                    'title': f'{category} Spending Alert',
-                    'description': f'Get notified for {category} transactions over ${cat_threshold:.2f}',
-                    'natural_language_query': f'Notify me when a {category} transaction exceeds ${cat_threshold:.2f}',
-                    'category': 'merchant_monitoring',
-                    'priority': priority,
-                    'reasoning': f'You spend frequently in {category} (avg: ${stats["mean"]:.2f}). This catches unusual purchases.',
-                    'threshold_amount': cat_threshold,
+                    'key': 'category_spending',
                     'confidence': 0.8,
+                    'params': {
+                        'category': category,
+                        'threshold': thresholds['category_thresholds'][category],
+                        'mean': stats['mean'],
+                        'priority': 'high' if idx == 0 else 'medium',
+                    },
                 }
             )
 
     # 4. Recurring charge monitoring (if subscriptions detected)
     recurring = merchants.get('recurring_merchants', {})
-    subscriptions = {
-        k: v for k, v in recurring.items() if v.get('is_likely_subscription')
-    }
+    subscriptions = [k for k, v in recurring.items() if v.get('is_likely_subscription')]
 
     if subscriptions:
-        subscription_list = ', '.join(list(subscriptions.keys())[:3])
-        recommendations.append(
+        candidates.append(
             {
-                'title': 'Subscription Price Change Alert',
-                'description': 'Monitor subscription charges for unexpected price increases',
-                'natural_language_query': 'Notify me if subscription charges change significantly',
-                'category': 'subscription_monitoring',
-                'priority': 'medium',
-                'reasoning': f'Detected recurring charges from {subscription_list}. Monitor for price changes.',
+                'key': 'subscription',
                 'confidence': 0.75,
+                'params': {'merchants': subscriptions[:3]},
             }
         )
 
@@ -122,54 +110,136 @@ def generate_transaction_based_recommendations(
         locations.get('travels_frequently')
         or locations.get('out_of_state_frequency', 0) > 0.1
     ):
-        home_state = locations.get('home_state', 'your home state')
-        recommendations.append(
+        candidates.append(
             {
-                'title': 'Out-of-State Transaction Alert',
-                'description': f'Get notified of transactions outside {home_state}',
-                'natural_language_query': f'Notify me of transactions outside of {home_state}',
-                'category': 'location_based',
-                'priority': 'medium',
-                'reasoning': 'You occasionally travel. This helps detect fraudulent out-of-state charges.',
+                'key': 'out_of_state',
                 'confidence': 0.7,
+                'params': {
+                    'home_state': locations.get('home_state', 'your home state')
+                },
             }
         )
 
     # 6. New merchant alert (based on merchant diversity)
     merchant_diversity = merchants.get('merchant_diversity', 0)
     if merchant_diversity > 0.3:  # User shops at many different merchants
-        recommendations.append(
-            {
-                'title': 'New Merchant Alert',
-                'description': 'Get notified when making purchases from new merchants',
-                'natural_language_query': 'Notify me when I make a purchase from a merchant I have not used before',
-                'category': 'fraud_protection',
-                'priority': 'medium',
-                'reasoning': 'You shop at various merchants. This helps detect fraudulent new merchant charges.',
-                'confidence': 0.65,
-            }
-        )
+        candidates.append({'key': 'new_merchant', 'confidence': 0.65, 'params': {}})
 
     # 7. High transaction frequency alert
     if (
         transaction_analysis['total_transactions'] / max(temporal['weeks_with_data'], 1)
         > 10
     ):
-        recommendations.append(
-            {
-                'title': 'Unusual Transaction Volume Alert',
-                'description': 'Get notified when you have an unusually high number of transactions in a day',
-                'natural_language_query': 'Notify me when I have more than 10 transactions in a single day',
-                'category': 'fraud_protection',
-                'priority': 'low',
-                'reasoning': 'High transaction frequency can indicate card compromise.',
-                'confidence': 0.6,
-            }
+        candidates.append(
+            {'key': 'transaction_volume', 'confidence': 0.6, 'params': {}}
         )
 
-    # Sort by confidence and return top 5
-    recommendations.sort(key=lambda x: x['confidence'], reverse=True)
-    return recommendations[:5]
+    # Keep the top 5 by confidence, then render only those
+    top_candidates = heapq.nlargest(5, candidates, key=lambda x: x['confidence'])
+    return [
+        {
+            **_RECOMMENDATION_RENDERERS[candidate['key']](candidate['params']),
+            'confidence': candidate['confidence'],
+        }
+        for candidate in top_candidates
+    ]
+
+
+def _render_large_transaction(params: dict) -> dict[str, Any]:
+    threshold = params['threshold']
+    return {
+        'title': 'Large Transaction Alert',
+        'description': f'Get notified when a single transaction exceeds ${threshold:.2f}',
+        'natural_language_query': f'Notify me when a single transaction exceeds ${threshold:.2f}',
+        'category': 'fraud_protection',
+        'priority': 'high',
+        'reasoning': f'Based on your spending history (avg: ${params["mean"]:.2f}), transactions over ${threshold:.2f} are unusual',
+        'threshold_amount': threshold,
+    }
+
+
+def _render_weekly_spending(params: dict) -> dict[str, Any]:
+    threshold = params['threshold']
+    return {
+        'title': 'Weekly Spending Limit Alert',
+        'description': f'Get alerted when weekly spending exceeds ${threshold:.2f}',
+        'natural_language_query': f'Notify me when my weekly spending exceeds ${threshold:.2f}',
+        'category': 'spending_threshold',
+        'priority': 'high',
+        'reasoning': f'You typically spend ${params["avg_weekly_spending"]:.2f}/week. This helps catch unusual spending spikes.',
+        'threshold_amount': threshold,
+    }
+
+
+def _render_category_spending(params: dict) -> dict[str, Any]:
+    category = params['category']
+    threshold = params['threshold']
+    return {
+        'title': f'{category} Spending Alert',
+        'description': f'Get notified for {category} transactions over ${threshold:.2f}',
+        'natural_language_query': f'Notify me when a {category} transaction exceeds ${threshold:.2f}',
+        'category': 'merchant_monitoring',
+        'priority': params['priority'],
+        'reasoning': f'You spend frequently in {category} (avg: ${params["mean"]:.2f}). This catches unusual purchases.',
+        'threshold_amount': threshold,
+    }
+
+
+def _render_subscription(params: dict) -> dict[str, Any]:
+    subscription_list = ', '.join(params['merchants'])
+    return {
+        'title': 'Subscription Price Change Alert',
+        'description': 'Monitor subscription charges for unexpected price increases',
+        'natural_language_query': 'Notify me if subscription charges change significantly',
+        'category': 'subscription_monitoring',
+        'priority': 'medium',
+        'reasoning': f'Detected recurring charges from {subscription_list}. Monitor for price changes.',
+    }
+
+
+def _render_out_of_state(params: dict) -> dict[str, Any]:
+    home_state = params['home_state']
+    return {
+        'title': 'Out-of-State Transaction Alert',
+        'description': f'Get notified of transactions outside {home_state}',
+        'natural_language_query': f'Notify me of transactions outside of {home_state}',
+        'category': 'location_based',
+        'priority': 'medium',
+        'reasoning': 'You occasionally travel. This helps detect fraudulent out-of-state charges.',
+    }
+
+
+def _render_new_merchant(params: dict) -> dict[str, Any]:
+    return {
+        'title': 'New Merchant Alert',
+        'description': 'Get notified when making purchases from new merchants',
+        'natural_language_query': 'Notify me when I make a purchase from a merchant I have not used before',
+        'category': 'fraud_protection',
+        'priority': 'medium',
+        'reasoning': 'You shop at various merchants. This helps detect fraudulent new merchant charges.',
+    }
+
+
+def _render_transaction_volume(params: dict) -> dict[str, Any]:
+    return {
+        'title': 'Unusual Transaction Volume Alert',
+        'description': 'Get notified when you have an unusually high number of transactions in a day',
+        'natural_language_query': 'Notify me when I have more than 10 transactions in a single day',
+        'category': 'fraud_protection',
+        'priority': 'low',
+        'reasoning': 'High transaction frequency can indicate card compromise.',
+    }
+
+
+_RECOMMENDATION_RENDERERS: dict[str, Callable[[dict], dict[str, Any]]] = {
+    'large_transaction': _render_large_transaction,
+    'weekly_spending': _render_weekly_spending,
+    'category_spending': _render_category_spending,
+    'subscription': _render_subscription,
+    'out_of_state': _render_out_of_state,
+    'new_merchant': _render_new_merchant,
+    'transaction_volume': _render_transaction_volume,
+}
 
 
 def _generate_new_user_recommendations(user_profile: dict) -> list[dict[str, Any]]:
@@ -256,19 +326,24 @@ def combine_recommendations(
         list: Combined and ranked recommendations
     """
 
-    # Tag sources
-    for rec in transaction_based:
-        rec['source'] = 'transaction_analysis'
-        rec['final_score'] = rec.get('confidence', 0.5) * transaction_weight
-
-    for rec in collaborative_filtering:
-        rec['source'] = 'collaborative_filtering'
-        # Collaborative recommendations have probability scores
-        prob = rec.get('probability', 0.5)
-        rec['final_score'] = prob * collaborative_weight
-
-    # Combine all recommendations
-    all_recs = transaction_based + collaborative_filtering
+    # Tag sources and score while combining both lists in a single pass.
+    # Collaborative recommendations are scored by probability instead of
+    # confidence.
+    sources = (
+        (transaction_based, 'transaction_analysis', 'confidence', transaction_weight),
+        (
+            collaborative_filtering,
+            'collaborative_filtering',
+            'probability',
+            collaborative_weight,
+        ),
+    )
+    all_recs = []
+    for recs, source, score_key, weight in sources:
+        for rec in recs:
+            rec['source'] = source
+            rec['final_score'] = rec.get(score_key, 0.5) * weight
+            all_recs.append(rec)
 
     # Remove duplicates based on similar titles
     deduplicated = _deduplicate_recommendations(all_recs)
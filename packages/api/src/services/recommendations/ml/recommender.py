@@ -11,10 +11,12 @@ Uses trained KNN model to find similar users and recommend alerts
 based on collaborative filtering approach.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import os
-import pickle
 from typing import Any
+import uuid
 
+import joblib
 import numpy as np
 import pandas as pd
 from sklearn.neighbors import NearestNeighbors
@@ -25,6 +27,23 @@ from .feature_engineering import (
     get_similarity_feature_columns,
 )
 
+# Default model path - use /tmp for container compatibility
+DEFAULT_MODEL_PATH = os.path.join('/tmp', 'ml_models', 'model_knn.pkl')
+
+# Maximum number of query rows scored against the training matrix at once
+_QUERY_BLOCK_SIZE = 1024
+
+_ALERT_DESCRIPTIONS = {
+    'high_spender': 'monitoring high spending patterns',
+    'high_tx_volume': 'tracking transaction frequency',
+    'high_merchant_diversity': 'detecting diverse merchant usage',
+    'near_credit_limit': 'monitoring credit utilization',
+    'large_transaction': 'detecting large purchases',
+    'new_merchant': 'tracking new merchant visits',
+    'location_based': 'monitoring location-based activity',
+    'subscription_monitoring': 'tracking subscription services',
+}
+
 
 class AlertRecommenderModel:
     """
@@ -42,8 +61,7 @@ class AlertRecommenderModel:
             model_path: Path to saved model file. If None, uses default path.
         """
         if model_path is None:
-            # Default model path - use /tmp for container compatibility
-            model_path = os.path.join('/tmp', 'ml_models', 'model_knn.pkl')
+            model_path = DEFAULT_MODEL_PATH
 
         self.model_path = model_path
         self.knn: NearestNeighbors | None = None
@@ -51,6 +69,12 @@ class AlertRecommenderModel:
         self.feature_cols: list[str] = []
         self.alert_cols: list[str] = []
         self.user_data: pd.DataFrame | None = None
+        self._alert_matrix: np.ndarray | None = None
+        self._alert_names: np.ndarray = np.array([], dtype=str)
+        self._X_scaled: np.ndarray | None = None
+        self._X_norm: np.ndarray | None = None
+        self._user_ids: np.ndarray | None = None
+        self._user_index: dict[str, int] = {}
 
         # Try to load model if it exists
         if os.path.exists(self.model_path):
@@ -58,14 +82,20 @@ class AlertRecommenderModel:
 
     def load_model(self) -> None:
         """Load trained model from disk"""
-        with open(self.model_path, 'rb') as f:
-            model_data = pickle.load(f)
+        # joblib also reads models saved with plain pickle
+        model_data = joblib.load(self.model_path)
 
         self.knn = model_data['knn']
         self.scaler = model_data['scaler']
         self.feature_cols = model_data['feature_cols']
         self.alert_cols = model_data.get('alert_cols', get_alert_columns())
-        self.user_data = model_data.get('user_data')
+        user_data = model_data.get('user_data')
+        self.user_data = (
+            self._select_model_columns(user_data) if user_data is not None else None
+        )
+        self._build_lookup_cache(
+            self.user_data, index=self._load_index(model_data.get('index_token'))
+        )
 
         print(f'Model loaded from {self.model_path}')
 
@@ -80,13 +110,60 @@ class AlertRecommenderModel:
             'feature_cols': self.feature_cols,
             'alert_cols': self.alert_cols,
             'user_data': self.user_data,
+            'index_token': self._save_index(),
         }
 
-        with open(self.model_path, 'wb') as f:
-            pickle.dump(model_data, f)
+        joblib.dump(model_data, self.model_path, compress=3)
 
         print(f'Model saved to {self.model_path}')
 
+    def _index_path(self) -> str:
+        """Path of the search index arrays stored beside the model file"""
+        return f'{os.path.splitext(self.model_path)[0]}_index.joblib'
+
+    def _save_index(self) -> str | None:
+        """
+        Write the cached search arrays uncompressed so they can be memory-mapped.
+
+        Returns a token that ties the index file to the model file saved with
+        it, or None when there is nothing to save.
+        """
+        if self._X_norm is None:
+            return None
+
+        token = uuid.uuid4().hex
+        index = {
+            'token': token,
+            'X_scaled': self._X_scaled,
+            'X_norm': self._X_norm,
+            'alert_matrix': self._alert_matrix,
+        }
+        joblib.dump(index, self._index_path())
+        return token
+
+    def _load_index(self, token: str | None) -> dict[str, Any] | None:
+        """
+        Memory-map the search arrays saved with this model.
+
+        Read-only mapped arrays are shared through the page cache by every
+        worker process. Returns None if the index is missing or was written
+        for a different model file, in which case the arrays are rebuilt.
+        """
+        if token is None or self.user_data is None:
+            return None
+
+        try:
+            index = joblib.load(self._index_path(), mmap_mode='r')
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f'Ignoring unreadable model index {self._index_path()}: {e}')
+            return None
+
+        if index.get('token') != token or len(index['X_norm']) != len(self.user_data):
+            return None
+        return index
+
     def train(
         self,
         user_features_df: pd.DataFrame,
@@ -101,9 +178,6 @@ class AlertRecommenderModel:
             n_neighbors: Number of neighbors to use for KNN
             metric: Distance metric for KNN (default: cosine)
         """
-        # Store user data for later use
-        self.user_data = user_features_df.copy()
-
         # Get feature columns
         self.feature_cols = get_similarity_feature_columns()
 
@@ -117,21 +191,88 @@ class AlertRecommenderModel:
             col for col in user_features_df.columns if col.startswith('alert_')
         ]
 
+        # Store user data for later use, keeping only the columns the model reads
+        self.user_data = self._select_model_columns(user_features_df).copy()
+
         # Prepare feature matrix
         X = user_features_df[self.feature_cols].fillna(0)
 
-        # Scale features
+        # Scale features; the float32 copy is what the search index and the
+        # pickled KNN keep, halving their size versus float64
         self.scaler = StandardScaler()
-        X_scaled = self.scaler.fit_transform(X)
+        X_scaled = self.scaler.fit_transform(X).astype(np.float32)
 
         # Train KNN model (n_neighbors+1 because the closest neighbor is the user themselves)
-        self.knn = NearestNeighbors(n_neighbors=n_neighbors + 1, metric=metric)
+        self.knn = NearestNeighbors(
+            n_neighbors=n_neighbors + 1, metric=metric, algorithm='brute'
+        )
         self.knn.fit(X_scaled)
 
+        self._build_lookup_cache(user_features_df, X_scaled)
+
         print(
             f'Model trained with {len(user_features_df)} users and {n_neighbors} neighbors'
         )
 
+    def _select_model_columns(self, user_features_df: pd.DataFrame) -> pd.DataFrame:
+        """Restrict a user features frame to user_id, feature and alert columns"""
+        columns = ['user_id', *self.feature_cols, *self.alert_cols]
+        return user_features_df[
+            [col for col in columns if col in user_features_df.columns]
+        ]
+
+    def _build_lookup_cache(
+        self,
+        user_features_df: pd.DataFrame | None,
+        X_scaled: np.ndarray | None = None,
+        index: dict[str, Any] | None = None,
+    ) -> None:
+        """
+        Cache per-user arrays derived from the training data.
+
+        Keeps the scaled feature matrix, alert labels and a user_id -> row
+        lookup so requests for known users skip the DataFrame filter and
+        scaler transform. A saved index supplies the arrays directly.
+        """
+        # Alert type names without the 'alert_' column prefix
+        self._alert_names = np.array(
+            [col.removeprefix('alert_') for col in self.alert_cols], dtype=str
+        )
+
+        if user_features_df is None:
+            self._alert_matrix = None
+            self._X_scaled = None
+            self._X_norm = None
+            self._user_ids = None
+            self._user_index = {}
+            return
+
+        if index is not None:
+            self._alert_matrix = index['alert_matrix']
+            self._X_scaled = index['X_scaled']
+            self._X_norm = index['X_norm']
+        else:
+            if X_scaled is None:
+                X_scaled = self.scaler.transform(
+                    user_features_df[self.feature_cols].fillna(0)
+                )
+
+            self._alert_matrix = self._to_alert_matrix(user_features_df)
+            # Compact dtypes halve (features) or eighth (0/1 alert labels) the
+            # memory traffic of each neighbor search
+            self._X_scaled = np.asarray(X_scaled, dtype=np.float32)
+            self._X_norm = _l2_normalize(self._X_scaled)
+        self._user_ids = user_features_df['user_id'].to_numpy()
+        self._user_index = {uid: idx for idx, uid in enumerate(self._user_ids.tolist())}
+
+    def _to_alert_matrix(self, user_features_df: pd.DataFrame) -> np.ndarray:
+        """Extract alert columns as a (users x alerts) 0/1 array, missing as 0"""
+        return (
+            user_features_df.reindex(columns=self.alert_cols, fill_value=0)
+            .fillna(0)
+            .to_numpy(dtype=np.uint8)
+        )
+
     def recommend_for_user(
         self,
         user_id: str,
@@ -151,84 +292,240 @@ class AlertRecommenderModel:
         Returns:
             Dictionary with recommended alerts and their probabilities
         """
+        return self.recommend_for_users(
+            [user_id], user_features_df, k_neighbors=k_neighbors, threshold=threshold
+        )[user_id]
+
+    def recommend_for_users(
+        self,
+        user_ids: list[str],
+        user_features_df: pd.DataFrame,
+        k_neighbors: int = 5,
+        threshold: float = 0.4,
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Recommend alerts for a batch of users based on similar users.
+
+        All users are scaled and searched together, so per-call overhead is
+        paid once per batch instead of once per user.
+
+        Args:
+            user_ids: IDs of the users to recommend alerts for
+            user_features_df: DataFrame with all user features (including the target users)
+            k_neighbors: Number of similar users to consider
+            threshold: Minimum probability threshold to recommend an alert
+
+        Returns:
+            Dictionary mapping each user ID to its recommendation result
+        """
         if self.knn is None or self.scaler is None:
             raise ValueError(
                 'Model not trained or loaded. Please train or load a model first.'
             )
 
-        # Get this user's feature row
-        user_row = user_features_df[user_features_df['user_id'] == user_id]
-        if user_row.empty:
-            raise ValueError(f'User {user_id} not found in user_features_df')
+        if not user_ids:
+            return {}
 
-        # Get user's current alerts (if any)
-        current_alerts = {}
-        for alert_col in self.alert_cols:
-            if alert_col in user_row.columns:
-                current_alerts[alert_col] = int(user_row[alert_col].iloc[0])
+        # Get the users' feature rows
+        user_rows = self._lookup_user_rows(user_ids, user_features_df)
 
-        # Extract feature values
-        user_X = user_row[self.feature_cols].fillna(0)
-        user_scaled = self.scaler.transform(user_X)
+        # Get users' current alerts (if any)
+        current_alerts = self._to_alert_matrix(user_rows)
+
+        # Extract feature values, reusing cached rows for known users
+        user_scaled = self._scale_users(user_ids, user_rows)
 
         # Find neighbors
-        distances, neighbor_indices = self.knn.kneighbors(
-            user_scaled, n_neighbors=k_neighbors + 1
-        )
+        distances, neighbor_indices = self._kneighbors(user_scaled, k_neighbors + 1)
 
         # Get neighbor data (skip first neighbor which is the user themselves)
-        neighbor_idx = neighbor_indices[0][1:]
-        neighbor_distances = distances[0][1:]
+        neighbor_idx = neighbor_indices[:, 1:]
+        neighbor_distances = distances[:, 1:]
+        n_neighbors = neighbor_idx.shape[1]
 
-        neighbors = user_features_df.iloc[neighbor_idx]
+        alert_matrix = self._alert_matrix
+        training_user_ids = self._user_ids
+        if alert_matrix is None or training_user_ids is None:
+            alert_matrix = self._to_alert_matrix(user_features_df)
+            training_user_ids = user_features_df['user_id'].to_numpy()
+        neighbor_alerts = alert_matrix[neighbor_idx]
 
         # Compute alert probabilities based on neighbors
-        alert_probs = {}
-        for alert_col in self.alert_cols:
-            if alert_col in neighbors.columns:
-                # Simple average: fraction of neighbors with this alert enabled
-                prob = neighbors[alert_col].mean()
-                alert_probs[alert_col] = float(prob)
-            else:
-                alert_probs[alert_col] = 0.0
-
-        # Filter recommendations
+        # Simple average: fraction of neighbors with each alert enabled
+        probs = neighbor_alerts.mean(axis=1, dtype=np.float64)
+
+        # Filter recommendations for the whole batch at once
         # Only recommend alerts that:
         # 1. User doesn't already have
         # 2. Have probability >= threshold
-        recommendations = []
-        for alert_type, prob in alert_probs.items():
-            # Remove 'alert_' prefix for cleaner alert type name
-            alert_name = alert_type.replace('alert_', '')
-
-            # Skip if user already has this alert
-            if current_alerts.get(alert_type, 0) == 1:
-                continue
-
-            # Skip if probability is below threshold
-            if prob < threshold:
-                continue
-
-            recommendations.append(
-                {
-                    'alert_type': alert_name,
-                    'probability': prob,
-                    'confidence': self._calculate_confidence(prob, len(neighbor_idx)),
-                    'reason': self._generate_reason(
-                        alert_name, prob, len(neighbor_idx)
-                    ),
-                }
+        recommend_mask = (current_alerts != 1) & (probs >= threshold)
+
+        results = {}
+        for row, user_id in enumerate(user_ids):
+            kept = np.flatnonzero(recommend_mask[row])
+            recommendations = []
+            for alert_name, prob in zip(
+                self._alert_names[kept].tolist(), probs[row, kept].tolist(), strict=True
+            ):
+                recommendations.append(
+                    {
+                        'alert_type': alert_name,
+                        'probability': prob,
+                        'confidence': self._calculate_confidence(prob, n_neighbors),
+                        'reason': self._generate_reason(alert_name, prob, n_neighbors),
+                    }
+                )
+
+            # Sort by probability descending
+            recommendations.sort(key=lambda x: x['probability'], reverse=True)
+
+            results[user_id] = {
+                'user_id': user_id,
+                'recommendations': recommendations,
+                'similar_users': self._format_similar_users(
+                    training_user_ids[neighbor_idx[row]],
+                    neighbor_alerts[row],
+                    neighbor_distances[row],
+                ),
+                'total_similar_users': n_neighbors,
+            }
+
+        return results
+
+    def recommend_for_users_parallel(
+        self,
+        user_ids: list[str],
+        user_features_df: pd.DataFrame,
+        k_neighbors: int = 5,
+        threshold: float = 0.4,
+        n_workers: int | None = None,
+        batch_size: int = 256,
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Recommend alerts for many users, scoring batches on a thread pool.
+
+        Intended for background jobs that recompute recommendations for all
+        users. NumPy releases the GIL for the neighbor search, so batches
+        scored on separate threads overlap.
+
+        Args:
+            user_ids: IDs of the users to recommend alerts for
+            user_features_df: DataFrame with all user features (including the target users)
+            k_neighbors: Number of similar users to consider
+            threshold: Minimum probability threshold to recommend an alert
+            n_workers: Number of worker threads (default: min(32, 2 x CPU count))
+            batch_size: Number of users scored per batch
+
+        Returns:
+            Dictionary mapping each user ID to its recommendation result
+        """
+        if n_workers is None:
+            n_workers = min(32, (os.cpu_count() or 1) * 2)
+
+        batches = [
+            user_ids[start : start + batch_size]
+            for start in range(0, len(user_ids), batch_size)
+        ]
+        if n_workers <= 1 or len(batches) <= 1:
+            return self.recommend_for_users(
+                user_ids, user_features_df, k_neighbors=k_neighbors, threshold=threshold
             )
 
-        # Sort by probability descending
-        recommendations.sort(key=lambda x: x['probability'], reverse=True)
+        results: dict[str, dict[str, Any]] = {}
+        with ThreadPoolExecutor(
+            max_workers=min(n_workers, len(batches)),
+            thread_name_prefix='recommender-worker',
+        ) as executor:
+            for batch_results in executor.map(
+                lambda batch: self.recommend_for_users(
+                    batch,
+                    user_features_df,
+                    k_neighbors=k_neighbors,
+                    threshold=threshold,
+                ),
+                batches,
+            ):
+                results.update(batch_results)
+
+        return results
+
+    def _lookup_user_rows(
+        self, user_ids: list[str], user_features_df: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Select the first feature row of each user, in the order of user_ids.
 
-        return {
-            'user_id': user_id,
-            'recommendations': recommendations,
-            'similar_users': self._format_similar_users(neighbors, neighbor_distances),
-            'total_similar_users': len(neighbor_idx),
-        }
+        Uses a hash lookup on user_id instead of a boolean-mask scan per user.
+        The index is built from the frame on every call, so in-place changes
+        to the frame are always seen.
+        """
+        if user_features_df.index.name == 'user_id':
+            index = user_features_df.index
+        else:
+            index = pd.Index(user_features_df['user_id'])
+
+        first_positions = None
+        if not index.is_unique:
+            is_first = ~index.duplicated(keep='first')
+            first_positions = np.flatnonzero(is_first)
+            index = index[is_first]
+
+        positions = index.get_indexer(user_ids)
+        missing = [uid for uid, pos in zip(user_ids, positions, strict=True) if pos < 0]
+        if missing:
+            raise ValueError(
+                f'User {", ".join(map(str, missing))} not found in user_features_df'
+            )
+
+        if first_positions is not None:
+            positions = first_positions[positions]
+        return user_features_df.iloc[positions]
+
+    def _scale_users(self, user_ids: list[str], user_rows: pd.DataFrame) -> np.ndarray:
+        """Scaled feature rows for the given users, from the cache where possible"""
+        cached_rows = [self._user_index.get(uid) for uid in user_ids]
+        unknown = [row for row, cached in enumerate(cached_rows) if cached is None]
+        if not unknown:
+            return self._X_scaled[cached_rows]
+
+        user_scaled = np.empty((len(user_ids), len(self.feature_cols)), np.float32)
+        user_scaled[unknown] = self.scaler.transform(
+            user_rows.iloc[unknown][self.feature_cols].fillna(0)
+        )
+        for row, cached_row in enumerate(cached_rows):
+            if cached_row is not None:
+                user_scaled[row] = self._X_scaled[cached_row]
+        return user_scaled
+
+    def _kneighbors(
+        self, user_scaled: np.ndarray, n_neighbors: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the nearest training users to each scaled feature row.
+
+        For cosine distance this is a matrix product against the pre-normalized
+        training matrix followed by a partial top-k selection, which avoids
+        sklearn's per-call validation; other metrics go through the fitted
+        NearestNeighbors.
+        """
+        if self._X_norm is None or self.knn.metric != 'cosine':
+            return self.knn.kneighbors(user_scaled, n_neighbors=n_neighbors)
+
+        queries = _l2_normalize(np.asarray(user_scaled, dtype=np.float32))
+        if len(queries) <= _QUERY_BLOCK_SIZE:
+            return _cosine_top_k(queries, self._X_norm, n_neighbors)
+
+        # Score large batches in blocks to bound the distance matrix size
+        blocks = [
+            _cosine_top_k(
+                queries[start : start + _QUERY_BLOCK_SIZE], self._X_norm, n_neighbors
+            )
+            for start in range(0, len(queries), _QUERY_BLOCK_SIZE)
+        ]
+        return (
+            np.concatenate([distances for distances, _ in blocks]),
+            np.concatenate([indices for _, indices in blocks]),
+        )
 
     def _calculate_confidence(self, probability: float, n_neighbors: int) -> str:
         """Calculate confidence level based on probability and sample size"""
@@ -247,18 +544,7 @@ class AlertRecommenderModel:
         """Generate human-readable reason for recommendation"""
         percentage = int(probability * 100)
 
-        alert_descriptions = {
-            'high_spender': 'monitoring high spending patterns',
-            'high_tx_volume': 'tracking transaction frequency',
-            'high_merchant_diversity': 'detecting diverse merchant usage',
-            'near_credit_limit': 'monitoring credit utilization',
-            'large_transaction': 'detecting large purchases',
-            'new_merchant': 'tracking new merchant visits',
-            'location_based': 'monitoring location-based activity',
-            'subscription_monitoring': 'tracking subscription services',
-        }
-
-        description = alert_descriptions.get(alert_type, 'this type of monitoring')
+        description = _ALERT_DESCRIPTIONS.get(alert_type, 'this type of monitoring')
 
         return (
             f'{percentage}% of similar users have enabled {description}. '
@@ -266,33 +552,64 @@ class AlertRecommenderModel:
         )
 
     def _format_similar_users(
-        self, neighbors: pd.DataFrame, distances: np.ndarray
+        self,
+        neighbor_ids: np.ndarray,
+        neighbor_alerts: np.ndarray,
+        distances: np.ndarray,
     ) -> list[dict[str, Any]]:
         """Format similar user information for response"""
-        similar_users = []
-
-        for idx, (_, user) in enumerate(neighbors.iterrows()):
-            similar_users.append(
-                {
-                    'user_id': user.get('user_id', 'unknown'),
-                    'similarity_score': float(
-                        1 - distances[idx]
-                    ),  # Convert distance to similarity
-                    'enabled_alerts': [
-                        alert.replace('alert_', '')
-                        for alert in self.alert_cols
-                        if alert in user and user[alert] == 1
-                    ],
-                }
-            )
-
-        return similar_users
+        enabled = neighbor_alerts == 1
+        # Convert distance to similarity
+        similarities = (1 - distances).tolist()
+
+        return [
+            {
+                'user_id': user_id,
+                'similarity_score': similarities[idx],
+                'enabled_alerts': self._alert_names[enabled[idx]].tolist(),
+            }
+            for idx, user_id in enumerate(neighbor_ids.tolist())
+        ]
 
     def is_trained(self) -> bool:
         """Check if model is trained and ready for predictions"""
         return self.knn is not None and self.scaler is not None
 
 
+def _l2_normalize(X: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length, leaving all-zero rows as zeros"""
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return X / norms
+
+
+def _cosine_top_k(
+    queries: np.ndarray, X_norm: np.ndarray, n_neighbors: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Cosine distances and indices of the nearest rows of X_norm to each query.
+
+    Both inputs must be L2-normalized. The distance matrix is computed once and
+    transformed in place, then only the k closest candidates are sorted.
+    """
+    distances = queries @ X_norm.T
+    np.subtract(1.0, distances, out=distances)
+    np.clip(distances, 0.0, 2.0, out=distances)
+
+    n_samples = distances.shape[1]
+    if n_neighbors < n_samples:
+        # Partial selection of the k closest, then order only those k
+        candidates = np.argpartition(distances, n_neighbors - 1, axis=1)[
+            :, :n_neighbors
+        ]
+    else:
+        candidates = np.broadcast_to(np.arange(n_samples), distances.shape)
+    candidate_distances = np.take_along_axis(distances, candidates, axis=1)
+    order = np.lexsort((candidates, candidate_distances), axis=1)
+    indices = np.take_along_axis(candidates, order, axis=1)
+    return np.take_along_axis(candidate_distances, order, axis=1), indices
+
+
 def recommend_alerts(
     user_id: str,
     user_features_df: pd.DataFrame,
@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 import sys
 
 import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Add parent directory to path for imports
 sys.path.insert(0, '../../../..')
@@ -107,58 +108,60 @@ async def test_recommendations(model, features_df):
     print('Test 3: Generating Recommendations')
     print('=' * 60)
 
-    # Test for each user
-    for user_id in features_df['user_id'].values:
+    # Score every user in one batched call
+    try:
+        results = model.recommend_for_users(
+            user_ids=features_df['user_id'].tolist(),
+            user_features_df=features_df,
+            k_neighbors=2,
+            threshold=0.3,  # Lower threshold for testing
+        )
+    except Exception as e:
+        print(f'✗ Error: {e}')
+        return
+
+    for user_id, result in results.items():
         print(f'\nRecommendations for user: {user_id}')
         print('-' * 40)
 
-        try:
-            result = model.recommend_for_user(
-                user_id=user_id,
-                user_features_df=features_df,
-                k_neighbors=2,
-                threshold=0.3,  # Lower threshold for testing
+        print(f'✓ Found {result["total_similar_users"]} similar users')
+
+        if result['recommendations']:
+            print(f'\nRecommended alerts ({len(result["recommendations"])}):')
+            for rec in result['recommendations']:
+                print(f'  - {rec["alert_type"]}')
+                print(f'    Probability: {rec["probability"]:.2%}')
+                print(f'    Confidence: {rec["confidence"]}')
+                print(f'    Reason: {rec["reason"][:60]}...')
+        else:
+            print(
+                '  No recommendations (all alerts already enabled or below threshold)'
             )
 
-            print(f'✓ Found {result["total_similar_users"]} similar users')
-
-            if result['recommendations']:
-                print(f'\nRecommended alerts ({len(result["recommendations"])}):')
-                for rec in result['recommendations']:
-                    print(f'  - {rec["alert_type"]}')
-                    print(f'    Probability: {rec["probability"]:.2%}')
-                    print(f'    Confidence: {rec["confidence"]}')
-                    print(f'    Reason: {rec["reason"][:60]}...')
-            else:
-                print(
-                    '  No recommendations (all alerts already enabled or below threshold)'
-                )
-
-        except Exception as e:
-            print(f'✗ Error: {e}')
 
-
-async def test_database_integration():
-    """Test with actual database"""
+async def test_database_integration(session: AsyncSession | None = None):
+    """Test with actual database, reusing the caller's session when given"""
     print('\n' + '=' * 60)
     print('Test 4: Database Integration (Optional)')
     print('=' * 60)
 
-    try:
-        async with SessionLocal() as session:
-            print('✓ Database connection successful')
-
-            # Try to train model with real data
-            print('✓ Attempting to train model with real data...')
-            model = await train_model(
-                session=session,
-                model_path='/tmp/test_model_real.pkl',
-                n_neighbors=5,
-                use_real_alerts=True,
-            )
+    if session is None:
+        async with SessionLocal() as new_session:
+            return await test_database_integration(new_session)
 
-            print('✓ Model trained successfully with real data!')
-            print(f'  Model path: {model.model_path}')
+    try:
+        # Try to train model with real data
+        print('✓ Attempting to train model with real data...')
+        model = await train_model(
+            session=session,
+            model_path='/tmp/test_model_real.pkl',
+            n_neighbors=5,
+            use_real_alerts=True,
+        )
+
+        print('✓ Database connection successful')
+        print('✓ Model trained successfully with real data!')
+        print(f'  Model path: {model.model_path}')
 
     except Exception as e:
         print(f'⚠ Database test skipped: {e}')
@@ -8,21 +8,57 @@ Provides functionality for:
 3. Logging user alert choices for continuous learning
 """
 
-from datetime import datetime
+import asyncio
+import contextlib
+import hashlib
+import logging
 import os
+import time
 
+import joblib
+import numpy as np
 import pandas as pd
-from sqlalchemy import and_, select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .feature_engineering import (
+    apply_alert_labels,
     build_user_features,
-    extract_alert_types_from_rules,
+    extract_alert_labels_by_user,
     generate_initial_alert_labels,
     get_alert_columns,
-    merge_real_alert_labels,
+    get_similarity_feature_columns,
 )
-from .recommender import AlertRecommenderModel
+from .recommender import DEFAULT_MODEL_PATH, AlertRecommenderModel
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip when streaming the transactions table
+TRANSACTION_FETCH_SIZE = 10_000
+
+# Seconds a model file's mtime is trusted before stat() is called again
+MODEL_MTIME_TTL_SECONDS = 60
+
+# Model path -> (checked_at, mtime); cleared for a path whenever it is retrained
+_mtime_cache: dict[str, tuple[float, float]] = {}
+
+# Seconds to wait after an alert action so a burst of actions shares one check
+RETRAIN_DEBOUNCE_SECONDS = 30
+
+# Set by alert actions; drained by the background retrain-check worker
+_retrain_pending: asyncio.Event | None = None
+_retrain_worker: asyncio.Task | None = None
+
+# Bump when the feature pipeline changes so cached feature matrices are rebuilt
+FEATURE_CACHE_VERSION = 1
+
+_TRANSACTION_COLUMNS = [
+    'user_id',
+    'amount',
+    'merchant_name',
+    'merchant_category',
+    'transaction_date',
+]
 
 
 async def train_model(
@@ -30,6 +66,7 @@ async def train_model(
     model_path: str | None = None,
     n_neighbors: int = 5,
     use_real_alerts: bool = True,
+    skip_if_unchanged: bool = False,
 ) -> AlertRecommenderModel:
     """
     Train the alert recommendation model from database data.
@@ -39,89 +76,76 @@ async def train_model(
         model_path: Path to save the model (optional)
         n_neighbors: Number of neighbors for KNN
         use_real_alerts: Whether to use real user alerts or heuristic labels
+        skip_if_unchanged: Keep the saved model if it was trained on identical data
 
     Returns:
         Trained AlertRecommenderModel
     """
-    from db.models import AlertRule, Transaction, User
-
-    # Fetch users
-    users_result = await session.execute(select(User))
-    users = users_result.scalars().all()
-
-    # Fetch transactions
-    transactions_result = await session.execute(select(Transaction))
-    transactions = transactions_result.scalars().all()
+    from db.models import AlertRule
+
+    model = await asyncio.to_thread(AlertRecommenderModel, model_path)
+
+    # Reuse the feature matrix from the last run if the source tables are unchanged
+    cache_path = _feature_cache_path(model.model_path)
+    signature = await _feature_source_signature(session)
+    user_features = await asyncio.to_thread(load_cached_features, cache_path, signature)
+    if user_features is None:
+        user_features = await _build_feature_frame(session)
+        await asyncio.to_thread(
+            save_cached_features, cache_path, signature, user_features
+        )
+    else:
+        print(f'Using cached user features from {cache_path}')
 
-    # Convert to DataFrames
-    users_df = pd.DataFrame(
-        [
-            {
-                'id': u.id,
-                'credit_limit': float(u.credit_limit) if u.credit_limit else 0,
-                'credit_balance': float(u.credit_balance) if u.credit_balance else 0,
-            }
-            for u in users
-        ]
+    alert_rules = None
+    if use_real_alerts:
+        # Fetch all active alert rules in one query and label every user at once
+        rules_result = await session.execute(
+            select(AlertRule.user_id, AlertRule.natural_language_query).where(
+                AlertRule.is_active
+            )
+        )
+        alert_rules = pd.DataFrame.from_records(
+            rules_result.all(), columns=['user_id', 'natural_language_query']
+        )
+
+    # Labelling and fitting are CPU-bound; run them off the event loop so
+    # in-flight requests are not stalled by a retrain
+    return await asyncio.to_thread(
+        _fit_model, model, user_features, alert_rules, n_neighbors, skip_if_unchanged
     )
 
-    transactions_df = pd.DataFrame(
-        [
-            {
-                'user_id': t.user_id,
-                'amount': float(t.amount),
-                'merchant_name': t.merchant_name,
-                'merchant_category': t.merchant_category,
-                'transaction_date': t.transaction_date,
-            }
-            for t in transactions
-        ]
-    )
 
-    # Build user features
-    user_features = build_user_features(users_df, transactions_df)
+def _fit_model(
+    model: AlertRecommenderModel,
+    user_features: pd.DataFrame,
+    alert_rules: pd.DataFrame | None,
+    n_neighbors: int,
+    skip_if_unchanged: bool,
+) -> AlertRecommenderModel:
+    """
+    Label the feature matrix, fit the model and save it.
 
-    # Add alert labels
-    if use_real_alerts:
-        # Fetch alert rules from database
-        user_alerts_data = []
-
-        for user in users:
-            rules_result = await session.execute(
-                select(AlertRule).where(
-                    and_(AlertRule.user_id == user.id, AlertRule.is_active)
-                )
-            )
-            alert_rules = rules_result.scalars().all()
-
-            # Extract alert types from rules
-            alert_types = extract_alert_types_from_rules(
-                [
-                    {
-                        'id': rule.id,
-                        'name': rule.name,
-                        'natural_language_query': rule.natural_language_query,
-                        'description': rule.description,
-                    }
-                    for rule in alert_rules
-                ]
-            )
+    Args:
+        model: Model to train
+        user_features: Per-user feature matrix
+        alert_rules: Active alert rules (user_id, natural_language_query), or
+            None to use heuristic labels
+        n_neighbors: Number of neighbors for KNN
+        skip_if_unchanged: Keep the saved model if it was trained on identical data
 
-            # Add to user alerts data
-            for alert_type, enabled in alert_types.items():
-                if enabled:
-                    user_alerts_data.append(
-                        {
-                            'user_id': user.id,
-                            'alert_type': alert_type,
-                            'enabled': enabled,
-                        }
-                    )
-
-        if user_alerts_data:
-            user_alerts_df = pd.DataFrame(user_alerts_data)
-            user_features = merge_real_alert_labels(user_features, user_alerts_df)
-            print(f'Using real alert labels from {len(user_alerts_data)} alert rules')
+    Returns:
+        Trained AlertRecommenderModel
+    """
+    # Add alert labels
+    if alert_rules is not None:
+        alert_labels = extract_alert_labels_by_user(alert_rules)
+        alert_cols = get_alert_columns()
+        n_enabled = int(alert_labels[alert_cols].to_numpy().sum())
+
+        if n_enabled:
+            user_features = apply_alert_labels(user_features, alert_labels)
+            print(f'Using real alert labels from {n_enabled} alert rules')
         else:
             # No real alerts, fall back to heuristic
             user_features = generate_initial_alert_labels(user_features)
@@ -136,24 +160,179 @@ async def train_model(
         if alert_col not in user_features.columns:
             user_features[alert_col] = 0
 
+    # Skip training when the saved model was fit on exactly this data
+    data_hash = _training_data_hash(user_features, n_neighbors)
+    hash_path = f'{model.model_path}.hash'
+    if skip_if_unchanged and model.is_trained() and _read_hash(hash_path) == data_hash:
+        # Mark the existing model as current so age-based checks stay quiet
+        os.utime(model.model_path)
+        _mtime_cache.pop(model.model_path, None)
+        print('Training data unchanged since last save, keeping existing model')
+        return model
+
     # Train model
-    model = AlertRecommenderModel(model_path=model_path)
     model.train(user_features, n_neighbors=n_neighbors)
 
     # Save model
     model.save_model()
+    _mtime_cache.pop(model.model_path, None)
+    try:
+        with open(hash_path, 'w') as f:
+            f.write(data_hash)
+    except OSError as e:
+        print(f'Could not write training data hash {hash_path}: {e}')
 
     print(f'Model trained successfully with {len(user_features)} users')
 
     return model
 
 
+async def _build_feature_frame(session: AsyncSession) -> pd.DataFrame:
+    """
+    Build the per-user feature matrix from the users and transactions tables.
+
+    Args:
+        session: Database session
+
+    Returns:
+        DataFrame with one row per user and float32 similarity features
+    """
+    from db.models import User
+
+    # Fetch only the columns feature engineering needs, as plain row tuples
+    users = (
+        await session.execute(select(User.id, User.credit_limit, User.credit_balance))
+    ).all()
+
+    # Convert to DataFrames
+    users_df = pd.DataFrame.from_records(
+        users, columns=['id', 'credit_limit', 'credit_balance']
+    )
+    credit_cols = ['credit_limit', 'credit_balance']
+    users_df[credit_cols] = users_df[credit_cols].astype(float).fillna(0.0)
+
+    transactions_df = await _stream_transactions_frame(session)
+
+    # Build user features off the event loop; float32 halves the memory the
+    # KNN search reads
+    user_features = await asyncio.to_thread(
+        build_user_features, users_df, transactions_df
+    )
+    feature_cols = get_similarity_feature_columns()
+    user_features[feature_cols] = user_features[feature_cols].astype(np.float32)
+    return user_features
+
+
+async def _feature_source_signature(session: AsyncSession) -> tuple:
+    """
+    Summarize the users and transactions tables in one cheap aggregate query.
+
+    Row counts and latest timestamps change whenever rows are added, removed or
+    updated, so an unchanged signature means the feature matrix is unchanged.
+    """
+    from db.models import Transaction, User
+
+    stmt = select(
+        select(func.count(User.id)).scalar_subquery(),
+        select(func.max(User.updated_at)).scalar_subquery(),
+        select(func.count(Transaction.id)).scalar_subquery(),
+        select(func.max(Transaction.updated_at)).scalar_subquery(),
+        select(func.max(Transaction.transaction_date)).scalar_subquery(),
+    )
+    row = (await session.execute(stmt)).one()
+    return (FEATURE_CACHE_VERSION, *row)
+
+
+def _training_data_hash(user_features: pd.DataFrame, n_neighbors: int) -> str:
+    """Content hash of the exact features, labels and settings a model is fit on"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((n_neighbors, list(user_features.columns))).encode())
+    digest.update(
+        pd.util.hash_pandas_object(user_features, index=False).to_numpy().tobytes()
+    )
+    return digest.hexdigest()
+
+
+def _read_hash(hash_path: str) -> str | None:
+    """Read a stored training data hash, or None if there is none"""
+    try:
+        with open(hash_path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _feature_cache_path(model_path: str) -> str:
+    """Path of the cached feature matrix stored beside the model file"""
+    return f'{os.path.splitext(model_path)[0]}_features.joblib'
+
+
+def load_cached_features(cache_path: str, signature: tuple) -> pd.DataFrame | None:
+    """Load the cached feature matrix if it was built from the same source data"""
+    try:
+        cached = joblib.load(cache_path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f'Ignoring unreadable feature cache {cache_path}: {e}')
+        return None
+
+    if cached.get('signature') != signature:
+        return None
+    return cached['user_features']
+
+
+def save_cached_features(
+    cache_path: str, signature: tuple, user_features: pd.DataFrame
+) -> None:
+    """Store the feature matrix with the signature of the data it was built from"""
+    try:
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        joblib.dump(
+            {'signature': signature, 'user_features': user_features}, cache_path
+        )
+    except OSError as e:
+        print(f'Could not write feature cache {cache_path}: {e}')
+
+
+async def _stream_transactions_frame(session: AsyncSession) -> pd.DataFrame:
+    """
+    Stream transactions through a server-side cursor into a DataFrame.
+
+    Each partition is converted to a columnar chunk as it arrives so the
+    full table never exists as a list of Python row objects.
+
+    Args:
+        session: Database session
+
+    Returns:
+        DataFrame with the transaction columns used by feature engineering
+    """
+    from db.models import Transaction
+
+    stmt = select(
+        *(getattr(Transaction, col) for col in _TRANSACTION_COLUMNS)
+    ).execution_options(yield_per=TRANSACTION_FETCH_SIZE)
+
+    chunks = []
+    result = await session.stream(stmt)
+    async for partition in result.partitions():
+        chunk = pd.DataFrame.from_records(partition, columns=_TRANSACTION_COLUMNS)
+        chunk['amount'] = chunk['amount'].astype(float)
+        chunks.append(chunk)
+
+    if not chunks:
+        return pd.DataFrame(columns=_TRANSACTION_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
+
+
 async def retrain_model(
     session: AsyncSession, model_path: str | None = None, n_neighbors: int = 5
 ) -> AlertRecommenderModel:
     """
     Retrain the model with updated data.
-    Always uses real alert labels from the database.
+    Always uses real alert labels from the database, and keeps the existing
+    model when the training data has not changed since it was saved.
 
     Args:
         session: Database session
@@ -169,6 +348,7 @@ async def retrain_model(
         model_path=model_path,
         n_neighbors=n_neighbors,
         use_real_alerts=True,
+        skip_if_unchanged=True,
     )
 
 
@@ -202,6 +382,57 @@ async def log_user_alert_action(
         f'Alert action logged: user={user_id}, alert={alert_rule_id}, action={action}'
     )
 
+    # Never block the request on the retrain decision
+    _schedule_retrain_check()
+
+
+def _schedule_retrain_check() -> None:
+    """Flag a pending retrain check, starting the worker on this loop if needed"""
+    global _retrain_pending, _retrain_worker
+
+    loop = asyncio.get_running_loop()
+    if (
+        _retrain_worker is None
+        or _retrain_worker.done()
+        or _retrain_worker.get_loop() is not loop
+    ):
+        _retrain_pending = asyncio.Event()
+        _retrain_worker = loop.create_task(
+            _retrain_check_worker(_retrain_pending), name='ml-retrain-check'
+        )
+    _retrain_pending.set()
+
+
+async def _retrain_check_worker(pending: asyncio.Event) -> None:
+    """
+    Run at most one retrain check per debounce window, however many alert
+    actions arrive in it.
+    """
+    from db.database import SessionLocal
+
+    while True:
+        await pending.wait()
+        await asyncio.sleep(RETRAIN_DEBOUNCE_SECONDS)
+        pending.clear()
+
+        try:
+            if should_retrain_model(DEFAULT_MODEL_PATH):
+                async with SessionLocal() as session:
+                    await retrain_model(session, model_path=DEFAULT_MODEL_PATH)
+        except Exception:
+            logger.exception('Background retrain check failed')
+
+
+async def stop_retrain_worker() -> None:
+    """Cancel the background retrain-check worker, if it is running"""
+    global _retrain_pending, _retrain_worker
+
+    worker, _retrain_worker, _retrain_pending = _retrain_worker, None, None
+    if worker is not None and not worker.done():
+        worker.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await worker
+
 
 def should_retrain_model(
     model_path: str | None = None, days_threshold: int = 7
@@ -219,12 +450,19 @@ def should_retrain_model(
     if model_path is None:
         model_path = os.path.join(os.path.dirname(__file__), 'models', 'model_knn.pkl')
 
-    # Check if model exists
-    if not os.path.exists(model_path):
-        return True  # Model doesn't exist, needs training
+    now = time.time()
+    cached = _mtime_cache.get(model_path)
+    if cached is not None and now - cached[0] < MODEL_MTIME_TTL_SECONDS:
+        model_modified_time = cached[1]
+    else:
+        # Check if model exists
+        try:
+            model_modified_time = os.path.getmtime(model_path)
+        except OSError:
+            return True  # Model doesn't exist, needs training
+        _mtime_cache[model_path] = (now, model_modified_time)
 
     # Check model age
-    model_modified_time = os.path.getmtime(model_path)
-    model_age_days = (datetime.now().timestamp() - model_modified_time) / (24 * 3600)
+    model_age_days = (now - model_modified_time) / (24 * 3600)
 
     return model_age_days > days_threshold
@@ -5,18 +5,30 @@ This client calls the deployed InferenceService on OpenShift AI
 instead of loading the model locally in the API pod.
 """
 
+import asyncio
+from collections.abc import Coroutine
 import logging
 import os
-from typing import Any
+import threading
+from typing import Any, TypeVar
 
 import httpx
+import numpy as np
+import orjson
+
+from .ml.feature_engineering import get_similarity_feature_columns
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
 
 class MLInferenceClient:
     """Client for calling ML inference service on OpenShift AI"""
 
+    # Feature order of the training schema the deployed model was fit on
+    FEATURE_ORDER: tuple[str, ...] = tuple(get_similarity_feature_columns())
+
     def __init__(
         self,
         endpoint_url: str | None = None,
@@ -38,8 +50,86 @@ class MLInferenceClient:
         self.model_name = model_name
         self.timeout = timeout
 
+        # Pooled HTTP clients, one per event loop that uses this instance
+        self._clients: dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
         logger.info(f'ML Inference Client initialized: {self.endpoint_url}')
 
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Return the pooled HTTP client for the running event loop.
+
+        Connections are bound to the loop they were opened on, so each loop
+        gets its own client. Clients of loops that have since closed are
+        dropped; their connections were torn down with the loop.
+
+        Returns:
+            Shared httpx.AsyncClient instance
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            self._clients = {
+                other: other_client
+                for other, other_client in self._clients.items()
+                if not other.is_closed()
+            }
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self) -> None:
+        """
+        Close the pooled HTTP clients and release their connections.
+
+        Each client is closed on the loop that owns it. Clients whose loop
+        has closed or is no longer running are dropped without closing.
+        """
+        clients, self._clients = self._clients, {}
+        current = asyncio.get_running_loop()
+        for loop, client in clients.items():
+            try:
+                if loop is current:
+                    await client.aclose()
+                elif loop.is_running():
+                    await asyncio.wrap_future(
+                        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+                    )
+            except RuntimeError as e:
+                logger.debug(f'Skipping close of inference client: {e}')
+
+    def _feature_vector(self, user_features: dict[str, float] | list) -> np.ndarray:
+        """
+        Convert user features to a float32 vector in model input order.
+
+        Args:
+            user_features: Feature dict keyed by name, or values already ordered
+
+        Returns:
+            1-D float32 array of feature values
+        """
+        if not isinstance(user_features, dict):
+            return np.asarray(user_features, dtype=np.float32)
+
+        if user_features.keys() >= set(self.FEATURE_ORDER):
+            return np.fromiter(
+                (user_features[name] for name in self.FEATURE_ORDER),
+                dtype=np.float32,
+                count=len(self.FEATURE_ORDER),
+            )
+
+        # Not the training schema; fall back to the caller's key order
+        logger.warning(
+            'User features do not match the model feature schema; '
+            'sending values in dict order'
+        )
+        return np.fromiter(
+            user_features.values(), dtype=np.float32, count=len(user_features)
+        )
+
     async def get_recommendations(
         self,
         user_features: dict[str, float],
@@ -59,67 +149,91 @@ class MLInferenceClient:
         Returns:
             Dictionary with recommendations and metadata
         """
+        results = await self.get_recommendations_batch(
+            [(user_id, user_features)], k_neighbors=k_neighbors, threshold=threshold
+        )
+        return results[0]
+
+    async def get_recommendations_batch(
+        self,
+        users: list[tuple[str | None, dict[str, float]]],
+        k_neighbors: int = 5,
+        threshold: float = 0.4,
+    ) -> list[dict[str, Any]]:
+        """
+        Get alert recommendations for many users in a single inference request.
+
+        Args:
+            users: (user_id, user_features) pairs to score
+            k_neighbors: Number of similar users to consider
+            threshold: Minimum probability threshold for recommendations
+
+        Returns:
+            One result dictionary per user, in input order
+        """
+        if not users:
+            return []
+
         try:
-            # Prepare request in MLServer V2 format
-            # Convert user_features dict to list of values in expected order
-            feature_values = (
-                list(user_features.values())
-                if isinstance(user_features, dict)
-                else user_features
+            # Prepare request in MLServer V2 format, one row per user
+            # FP32 halves the payload and KNN scoring does not need FP64
+            # precision; orjson serializes the array without a Python float list
+            features = np.stack(
+                [self._feature_vector(user_features) for _, user_features in users]
             )
 
             request_data = {
                 'inputs': [
                     {
                         'name': 'input-0',
-                        'shape': [1, len(feature_values)],
-                        'datatype': 'FP64',
-                        'data': [feature_values],
+                        'shape': list(features.shape),
+                        'datatype': 'FP32',
+                        'parameters': {'content_type': 'np'},
+                        'data': features,
                     }
                 ],
                 'parameters': {
-                    'user_id': user_id,
+                    'user_ids': [user_id for user_id, _ in users],
                     'k_neighbors': k_neighbors,
                     'threshold': threshold,
                 },
             }
 
             # Call MLServer V2 inference endpoint
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                url = f'{self.endpoint_url}/v2/models/alert-recommender/infer'
-                logger.debug(f'Calling MLServer V2 inference endpoint: {url}')
+            url = f'{self.endpoint_url}/v2/models/alert-recommender/infer'
+            logger.debug(f'Calling MLServer V2 inference endpoint: {url}')
 
-                response = await client.post(
-                    url, json=request_data, headers={'Content-Type': 'application/json'}
-                )
-                response.raise_for_status()
+            response = await self._get_client().post(
+                url,
+                content=orjson.dumps(request_data, option=orjson.OPT_SERIALIZE_NUMPY),
+                headers={'Content-Type': 'application/json'},
+            )
+            response.raise_for_status()
 
             # Parse MLServer V2 response format
-            result = response.json()
+            result = orjson.loads(response.content)
 
             # Extract recommendations from MLServer response
             # MLServer returns: {"outputs": [{"name": "output-0", "data": [...]}]}
             outputs = result.get('outputs', [])
             data = outputs[0].get('data', []) if outputs else []
+            if not isinstance(data, list):
+                data = []
+            metadata = result.get('parameters', {})
+
+            # The KNNRecommender.predict() returns a list per input row
+            formatted_results = [
+                {
+                    'recommendations': data[i] if i < len(data) else [],
+                    'user_id': user_id,
+                    'metadata': metadata,
+                }
+                for i, (user_id, _) in enumerate(users)
+            ]
 
-            # The KNNRecommender.predict() returns a list per input
-            # Since we send one input, extract the first (and only) element
-            recommendations = (
-                data[0] if data and isinstance(data, list) and len(data) > 0 else []
-            )
+            logger.info(f'Got recommendations from MLServer for {len(users)} user(s)')
 
-            formatted_result = {
-                'recommendations': recommendations,
-                'user_id': user_id,
-                'metadata': result.get('parameters', {}),
-            }
-
-            logger.info(
-                f'Got {len(recommendations)} recommendations from MLServer '
-                f'for user {user_id}'
-            )
-
-            return formatted_result
+            return formatted_results
 
         except httpx.TimeoutException:
             logger.error(f'Timeout calling inference service: {self.endpoint_url}')
@@ -139,23 +253,22 @@ class MLInferenceClient:
             True if service is healthy, False otherwise
         """
         try:
-            async with httpx.AsyncClient(timeout=5) as client:
-                # MLServer V2 API uses /v2/health/ready
-                url = f'{self.endpoint_url}/v2/health/ready'
-                response = await client.get(url)
-                response.raise_for_status()
-
-                # MLServer returns empty body for successful ready check (200 OK means healthy)
-                is_healthy = response.status_code == 200
-
-                if is_healthy:
-                    logger.debug('Inference service is healthy')
-                else:
-                    logger.warning(
-                        f'Inference service unhealthy: status={response.status_code}'
-                    )
+            # MLServer V2 API uses /v2/health/ready
+            url = f'{self.endpoint_url}/v2/health/ready'
+            response = await self._get_client().get(url, timeout=5)
+            response.raise_for_status()
+
+            # MLServer returns empty body for successful ready check (200 OK means healthy)
+            is_healthy = response.status_code == 200
+
+            if is_healthy:
+                logger.debug('Inference service is healthy')
+            else:
+                logger.warning(
+                    f'Inference service unhealthy: status={response.status_code}'
+                )
 
-                return is_healthy
+            return is_healthy
 
         except Exception as e:
             logger.error(f'Health check failed: {e}')
@@ -169,11 +282,10 @@ class MLInferenceClient:
             Dictionary with model metadata
         """
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                url = f'{self.endpoint_url}/v1/models/{self.model_name}'
-                response = await client.get(url)
-                response.raise_for_status()
-                return response.json()
+            url = f'{self.endpoint_url}/v1/models/{self.model_name}'
+            response = await self._get_client().get(url, timeout=10)
+            response.raise_for_status()
+            return orjson.loads(response.content)
 
         except Exception as e:
             logger.error(f'Error getting model metadata: {e}')
@@ -183,6 +295,10 @@ class MLInferenceClient:
 # Singleton instance
 _client: MLInferenceClient | None = None
 
+# Long-lived loop for synchronous callers, run on a daemon thread
+_background_loop: asyncio.AbstractEventLoop | None = None
+_background_lock = threading.Lock()
+
 
 def get_inference_client() -> MLInferenceClient:
     """
@@ -197,3 +313,55 @@ def get_inference_client() -> MLInferenceClient:
         _client = MLInferenceClient()
 
     return _client
+
+
+def _run_background_loop(loop: asyncio.AbstractEventLoop) -> None:
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_forever()
+    finally:
+        loop.close()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    global _background_loop
+
+    with _background_lock:
+        if _background_loop is None or _background_loop.is_closed():
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_run_background_loop,
+                args=(_background_loop,),
+                name='ml-inference-loop',
+                daemon=True,
+            ).start()
+        return _background_loop
+
+
+def run_inference_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run an inference client coroutine from synchronous code.
+
+    Worker threads share one long-lived event loop, so the pooled HTTP
+    client and its connections are reused across calls.
+
+    Args:
+        coro: Coroutine from an MLInferenceClient method
+
+    Returns:
+        The coroutine's result
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_background_loop()).result()
+
+
+async def close_inference_client() -> None:
+    """Close the inference client singleton and stop the background loop."""
+    global _background_loop
+
+    if _client is not None:
+        await _client.aclose()
+
+    with _background_lock:
+        loop, _background_loop = _background_loop, None
+    if loop is not None and not loop.is_closed():
+        loop.call_soon_threadsafe(loop.stop)
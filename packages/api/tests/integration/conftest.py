@@ -0,0 +1,13 @@
+"""Shared fixtures for API integration tests"""
+
+from fastapi.testclient import TestClient
+import pytest
+
+from src.main import app
+
+
+@pytest.fixture(scope='session')
+def client():
+    """Test client for the app, with startup/shutdown run once per session"""
+    with TestClient(app) as test_client:
+        yield test_client
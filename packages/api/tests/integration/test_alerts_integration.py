@@ -1,17 +1,13 @@
 """Tests for alert endpoints"""
 
-from fastapi.testclient import TestClient
 import pytest
 
-from src.main import app
-
-client = TestClient(app)
-
 
 class TestUserSetup:
     """Setup user for alert tests"""
 
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def setup_user(self, client):
         """Create a test user before each test"""
         self.user_payload = {
             'email': 'alert.test@example.com',
@@ -37,13 +33,13 @@ class TestUserSetup:
 class TestAlertRules(TestUserSetup):
     """Test alert rule endpoints"""
 
-    def test_get_alert_rules_empty(self):
+    def test_get_alert_rules_empty(self, client):
         """Test getting alert rules when none exist"""
         response = client.get('/alerts/rules')
         assert response.status_code == 200
         assert response.json() == []
 
-    def test_create_alert_rule(self):
+    def test_create_alert_rule(self, client):
         """Test creating a new alert rule"""
         payload = {
             'user_id': self.user_id,
@@ -67,7 +63,7 @@ class TestAlertRules(TestUserSetup):
         assert 'created_at' in data
         assert 'updated_at' in data
 
-    def test_create_alert_rule_invalid_user(self):
+    def test_create_alert_rule_invalid_user(self, client):
         """Test creating alert rule with non-existent user"""
         payload = {
             'user_id': 'non-existent-user',
@@ -80,7 +76,7 @@ class TestAlertRules(TestUserSetup):
         assert response.status_code == 404
         assert 'User not found' in response.json()['detail']
 
-    def test_get_alert_rule_by_id(self):
+    def test_get_alert_rule_by_id(self, client):
         """Test getting a specific alert rule"""
         # First create a rule
         create_payload = {
@@ -102,13 +98,13 @@ class TestAlertRules(TestUserSetup):
         assert data['name'] == create_payload['name']
         assert data['alert_type'] == create_payload['alert_type']
 
-    def test_get_alert_rule_not_found(self):
+    def test_get_alert_rule_not_found(self, client):
         """Test getting non-existent alert rule"""
         response = client.get('/alerts/rules/non-existent-id')
         assert response.status_code == 404
         assert 'Alert rule not found' in response.json()['detail']
 
-    def test_update_alert_rule(self):
+    def test_update_alert_rule(self, client):
         """Test updating an alert rule"""
         # First create a rule
         create_payload = {
@@ -136,7 +132,7 @@ class TestAlertRules(TestUserSetup):
         assert data['amount_threshold'] == update_payload['amount_threshold']
         assert data['is_active'] == update_payload['is_active']
 
-    def test_delete_alert_rule(self):
+    def test_delete_alert_rule(self, client):
         """Test deleting an alert rule without notifications"""
         # First create a rule
         create_payload = {
@@ -162,7 +158,7 @@ class TestAlertRules(TestUserSetup):
         get_response = client.get(f'/alerts/rules/{rule_id}')
         assert get_response.status_code == 404
 
-    def test_delete_alert_rule_with_notifications(self):
+    def test_delete_alert_rule_with_notifications(self, client):
         """Test deleting an alert rule that has associated notifications"""
         # First create a rule
         rule_payload = {
@@ -246,13 +242,13 @@ class TestAlertRules(TestUserSetup):
         assert rule_notifications_after_delete.status_code == 200
         assert rule_notifications_after_delete.json() == []
 
-    def test_delete_nonexistent_alert_rule(self):
+    def test_delete_nonexistent_alert_rule(self, client):
         """Test deleting a non-existent alert rule"""
         response = client.delete('/alerts/rules/non-existent-rule-id')
         assert response.status_code == 404
         assert 'Alert rule not found' in response.json()['detail']
 
-    def test_filter_alert_rules(self):
+    def test_filter_alert_rules(self, client):
         """Test filtering alert rules"""
         # Create multiple rules
         rules = [
@@ -292,13 +288,13 @@ class TestAlertRules(TestUserSetup):
 class TestAlertNotifications(TestUserSetup):
     """Test alert notification endpoints"""
 
-    def test_get_alert_notifications_empty(self):
+    def test_get_alert_notifications_empty(self, client):
         """Test getting notifications when none exist"""
         response = client.get('/alerts/notifications')
         assert response.status_code == 200
         assert response.json() == []
 
-    def test_create_alert_notification(self):
+    def test_create_alert_notification(self, client):
         """Test creating a new alert notification"""
         # First create an alert rule
         rule_payload = {
@@ -334,7 +330,7 @@ class TestAlertNotifications(TestUserSetup):
         assert 'id' in data
         assert 'created_at' in data
 
-    def test_create_notification_invalid_user(self):
+    def test_create_notification_invalid_user(self, client):
         """Test creating notification with non-existent user"""
         payload = {
             'user_id': 'non-existent-user',
@@ -349,7 +345,7 @@ class TestAlertNotifications(TestUserSetup):
         assert response.status_code == 404
         assert 'User not found' in response.json()['detail']
 
-    def test_create_notification_invalid_rule(self):
+    def test_create_notification_invalid_rule(self, client):
         """Test creating notification with non-existent alert rule"""
         payload = {
             'user_id': 'test-user-123',
@@ -364,7 +360,7 @@ class TestAlertNotifications(TestUserSetup):
         assert response.status_code == 404
         assert 'Alert rule not found' in response.json()['detail']
 
-    def test_get_notification_by_id(self):
+    def test_get_notification_by_id(self, client):
         """Test getting a specific notification"""
         # Create rule and notification
         rule_payload = {
@@ -402,7 +398,7 @@ class TestAlertNotifications(TestUserSetup):
             data['notification_method'] == notification_payload['notification_method']
         )
 
-    def test_update_notification(self):
+    def test_update_notification(self, client):
         """Test updating a notification"""
         # Create rule and notification
         rule_payload = {
@@ -441,7 +437,7 @@ class TestAlertNotifications(TestUserSetup):
         assert data['title'] == update_payload['title']
         assert data['status'] == update_payload['status']
 
-    def test_delete_notification(self):
+    def test_delete_notification(self, client):
         """Test deleting a notification"""
         # Create rule and notification
         rule_payload = {
@@ -481,7 +477,7 @@ class TestAlertNotifications(TestUserSetup):
 class TestUtilityEndpoints(TestUserSetup):
     """Test utility endpoints"""
 
-    def test_get_notifications_for_rule(self):
+    def test_get_notifications_for_rule(self, client):
         """Test getting notifications for a specific rule"""
         # Create a rule
         rule_payload = {
@@ -525,7 +521,7 @@ class TestUtilityEndpoints(TestUserSetup):
         assert len(data) == 2
         assert all(notification['alert_rule_id'] == rule_id for notification in data)
 
-    def test_trigger_alert_rule(self):
+    def test_trigger_alert_rule(self, client):
         """Test manually triggering an alert rule"""
         # Create an active rule
         rule_payload = {
@@ -553,7 +549,7 @@ class TestUtilityEndpoints(TestUserSetup):
         assert rule_data['trigger_count'] == 1
         assert rule_data['last_triggered'] is not None
 
-    def test_trigger_inactive_rule(self):
+    def test_trigger_inactive_rule(self, client):
         """Test triggering an inactive rule"""
         # Create an inactive rule
         rule_payload = {
@@ -2,18 +2,14 @@
 
 import uuid
 
-from fastapi.testclient import TestClient
 import pytest
 
-from src.main import app
-
-client = TestClient(app)
-
 
 class TestUserSetup:
     """Setup user and credit card for transaction tests"""
 
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def setup_user(self, client):
         """Create a test user and credit card before each test"""
         self.user_payload = {
             'email': 'transaction.test@example.com',
@@ -57,13 +53,13 @@ class TestUserSetup:
 class TestTransactions(TestUserSetup):
     """Test transaction endpoints"""
 
-    def test_get_transactions_empty(self):
+    def test_get_transactions_empty(self, client):
         """Test getting transactions when none exist"""
         response = client.get('/transactions')
         assert response.status_code == 200
         assert response.json() == []
 
-    def test_create_transaction(self):
+    def test_create_transaction(self, client):
         """Test creating a new transaction"""
         payload = {
             'id': str(uuid.uuid4()),
@@ -94,7 +90,7 @@ class TestTransactions(TestUserSetup):
         assert 'created_at' in data
         assert 'updated_at' in data
 
-    def test_create_transaction_invalid_user(self):
+    def test_create_transaction_invalid_user(self, client):
         """Test creating transaction with non-existent user"""
         payload = {
             'id': str(uuid.uuid4()),
@@ -114,7 +110,7 @@ class TestTransactions(TestUserSetup):
         assert response.status_code == 404
         assert 'User not found' in response.json()['detail']
 
-    def test_create_transaction_invalid_card(self):
+    def test_create_transaction_invalid_card(self, client):
         """Test creating transaction with non-existent credit card"""
         payload = {
             'id': str(uuid.uuid4()),
@@ -134,7 +130,7 @@ class TestTransactions(TestUserSetup):
         assert response.status_code == 404
         assert 'Credit card not found' in response.json()['detail']
 
-    def test_get_transaction_by_id(self):
+    def test_get_transaction_by_id(self, client):
         """Test getting a specific transaction"""
         # First create a transaction
         create_payload = {
@@ -163,13 +159,13 @@ class TestTransactions(TestUserSetup):
         assert data['amount'] == create_payload['amount']
         assert data['description'] == create_payload['description']
 
-    def test_get_transaction_not_found(self):
+    def test_get_transaction_not_found(self, client):
         """Test getting non-existent transaction"""
         response = client.get('/transactions/non-existent-id')
         assert response.status_code == 404
         assert 'Transaction not found' in response.json()['detail']
 
-    def test_update_transaction(self):
+    def test_update_transaction(self, client):
         """Test updating a transaction"""
         # First create a transaction
         create_payload = {
@@ -204,7 +200,7 @@ class TestTransactions(TestUserSetup):
         assert data['status'] == update_payload['status']
         assert data['amount'] == update_payload['amount']
 
-    def test_delete_transaction(self):
+    def test_delete_transaction(self, client):
         """Test deleting a transaction"""
         # First create a transaction
         create_payload = {
@@ -233,7 +229,7 @@ class TestTransactions(TestUserSetup):
         get_response = client.get(f'/transactions/{transaction_id}')
         assert get_response.status_code == 404
 
-    def test_filter_transactions(self):
+    def test_filter_transactions(self, client):
         """Test filtering transactions"""
         # Create multiple transactions
         transactions = [
@@ -293,7 +289,7 @@ class TestTransactions(TestUserSetup):
 class TestCreditCards(TestUserSetup):
     """Test credit card endpoints"""
 
-    def test_get_credit_cards(self):
+    def test_get_credit_cards(self, client):
         """Test getting credit cards"""
         response = client.get(f'/transactions/cards?user_id={self.user_id}')
         assert response.status_code == 200
@@ -301,7 +297,7 @@ class TestCreditCards(TestUserSetup):
         assert len(data) >= 1
         assert any(card['user_id'] == self.user_id for card in data)
 
-    def test_get_credit_card_by_id(self):
+    def test_get_credit_card_by_id(self, client):
         """Test getting a specific credit card"""
         response = client.get(f'/transactions/cards/{self.card_id}')
         assert response.status_code == 200
@@ -311,13 +307,13 @@ class TestCreditCards(TestUserSetup):
         assert data['user_id'] == self.user_id
         assert data['card_number'] == self.card_payload['card_number']
 
-    def test_get_credit_card_not_found(self):
+    def test_get_credit_card_not_found(self, client):
         """Test getting non-existent credit card"""
         response = client.get('/transactions/cards/non-existent-id')
         assert response.status_code == 404
         assert 'Credit card not found' in response.json()['detail']
 
-    def test_create_credit_card(self):
+    def test_create_credit_card(self, client):
         """Test creating a new credit card"""
         payload = {
             'user_id': self.user_id,
@@ -340,7 +336,7 @@ class TestCreditCards(TestUserSetup):
         assert 'id' in data
         assert 'created_at' in data
 
-    def test_create_credit_card_invalid_user(self):
+    def test_create_credit_card_invalid_user(self, client):
         """Test creating credit card with non-existent user"""
         payload = {
             'user_id': 'non-existent-user',
@@ -357,7 +353,7 @@ class TestCreditCards(TestUserSetup):
         assert response.status_code == 404
         assert 'User not found' in response.json()['detail']
 
-    def test_update_credit_card(self):
+    def test_update_credit_card(self, client):
         """Test updating a credit card"""
         update_payload = {'card_holder_name': 'Updated Name', 'is_active': False}
 
@@ -370,7 +366,7 @@ class TestCreditCards(TestUserSetup):
         assert data['card_holder_name'] == update_payload['card_holder_name']
         assert data['is_active'] == update_payload['is_active']
 
-    def test_delete_credit_card(self):
+    def test_delete_credit_card(self, client):
         """Test deleting a credit card"""
         # Create a card to delete
         payload = {
@@ -400,7 +396,7 @@ class TestCreditCards(TestUserSetup):
 class TestTransactionAnalysis(TestUserSetup):
     """Test transaction analysis endpoints"""
 
-    def test_get_transaction_summary(self):
+    def test_get_transaction_summary(self, client):
         """Test getting transaction summary"""
         # Create some transactions first
         transactions = [
@@ -446,7 +442,7 @@ class TestTransactionAnalysis(TestUserSetup):
         assert data['largestTransaction'] >= 200.0
         assert data['smallestTransaction'] >= 100.0
 
-    def test_get_category_spending(self):
+    def test_get_category_spending(self, client):
         """Test getting category spending breakdown"""
         # Create transactions in different categories
         transactions = [
@@ -495,13 +491,13 @@ class TestTransactionAnalysis(TestUserSetup):
             assert food_category['transactionCount'] >= 2
             assert food_category['averageAmount'] >= 62.5
 
-    def test_get_transaction_summary_invalid_user(self):
+    def test_get_transaction_summary_invalid_user(self, client):
         """Test getting summary for non-existent user"""
         response = client.get('/transactions/analysis/summary/non-existent-user')
         assert response.status_code == 404
         assert 'User not found' in response.json()['detail']
 
-    def test_get_category_spending_invalid_user(self):
+    def test_get_category_spending_invalid_user(self, client):
         """Test getting category breakdown for non-existent user"""
         response = client.get('/transactions/analysis/categories/non-existent-user')
         assert response.status_code == 404
@@ -511,7 +507,7 @@ class TestTransactionAnalysis(TestUserSetup):
 class TestUserTransactions(TestUserSetup):
     """Test user-specific transaction endpoints"""
 
-    def test_get_user_transactions(self):
+    def test_get_user_transactions(self, client):
         """Test getting transactions for a specific user"""
         # Create a transaction for the user
         tx_payload = {
@@ -538,7 +534,7 @@ class TestUserTransactions(TestUserSetup):
         assert len(data) >= 1
         assert all(tx['user_id'] == self.user_id for tx in data)
 
-    def test_get_user_credit_cards(self):
+    def test_get_user_credit_cards(self, client):
         """Test getting credit cards for a specific user"""
         response = client.get(f'/users/{self.user_id}/credit-cards')
         assert response.status_code == 200
@@ -547,7 +543,7 @@ class TestUserTransactions(TestUserSetup):
         assert len(data) >= 1
         assert all(card['user_id'] == self.user_id for card in data)
 
-    def test_get_user_credit_cards_active_only(self):
+    def test_get_user_credit_cards_active_only(self, client):
         """Test getting only active credit cards for a user"""
         response = client.get(f'/users/{self.user_id}/credit-cards?is_active=true')
         assert response.status_code == 200
@@ -555,13 +551,13 @@ class TestUserTransactions(TestUserSetup):
         data = response.json()
         assert all(card['is_active'] for card in data)
 
-    def test_get_user_transactions_invalid_user(self):
+    def test_get_user_transactions_invalid_user(self, client):
         """Test getting transactions for non-existent user"""
         response = client.get('/users/non-existent-user/transactions')
         assert response.status_code == 404
         assert 'User not found' in response.json()['detail']
 
-    def test_get_user_credit_cards_invalid_user(self):
+    def test_get_user_credit_cards_invalid_user(self, client):
         """Test getting credit cards for non-existent user"""
         response = client.get('/users/non-existent-user/credit-cards')
         assert response.status_code == 404
@@ -0,0 +1,183 @@
+"""Tests for the KNN Alert Recommender Model"""
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.recommendations.ml.feature_engineering import (
+    get_similarity_feature_columns,
+)
+from src.services.recommendations.ml.recommender import AlertRecommenderModel
+
+
+class TestAlertRecommenderModel:
+    """Test suite for AlertRecommenderModel"""
+
+    @pytest.fixture
+    def user_features(self):
+        """Two clusters of users: low spenders and high spenders"""
+        rows = []
+        for i in range(6):
+            high = i >= 3
+            row = {'user_id': f'user-{i}'}
+            for j, col in enumerate(get_similarity_feature_columns()):
+                row[col] = (1000.0 if high else 10.0) + (i * j) % 7
+            row['alert_high_spender'] = 1 if high else 0
+            row['alert_new_merchant'] = 0 if high else 1
+            rows.append(row)
+
+        # user-5 has not enabled the alert its cluster uses
+        rows[5]['alert_high_spender'] = 0
+        return pd.DataFrame(rows)
+
+    @pytest.fixture
+    def model(self, tmp_path, user_features):
+        """Model trained on the sample user features"""
+        model = AlertRecommenderModel(model_path=str(tmp_path / 'model_knn.pkl'))
+        model.train(user_features, n_neighbors=2)
+        return model
+
+    def test_recommends_alerts_enabled_by_neighbors(self, model, user_features):
+        """Test that alerts enabled by similar users are recommended"""
+        result = model.recommend_for_user(
+            'user-5', user_features, k_neighbors=2, threshold=0.5
+        )
+
+        assert result['user_id'] == 'user-5'
+        assert result['total_similar_users'] == 2
+        assert [r['alert_type'] for r in result['recommendations']] == ['high_spender']
+        assert result['recommendations'][0]['probability'] == 1.0
+
+    def test_skips_alerts_user_already_has(self, model, user_features):
+        """Test that existing alerts and low probabilities are filtered out"""
+        result = model.recommend_for_user(
+            'user-0', user_features, k_neighbors=2, threshold=0.5
+        )
+
+        assert result['recommendations'] == []
+        for similar_user in result['similar_users']:
+            assert similar_user['enabled_alerts'] == ['new_merchant']
+
+    def test_unknown_user_raises(self, model, user_features):
+        """Test that an unknown user ID is rejected"""
+        with pytest.raises(ValueError):
+            model.recommend_for_user('missing', user_features)
+
+    def test_save_and_load_round_trip(self, model, user_features):
+        """Test that a saved model gives the same recommendations when reloaded"""
+        model.save_model()
+        loaded = AlertRecommenderModel(model_path=model.model_path)
+
+        assert loaded.is_trained()
+        assert loaded.recommend_for_user(
+            'user-5', user_features, k_neighbors=2
+        ) == model.recommend_for_user('user-5', user_features, k_neighbors=2)
+
+    def test_load_memory_maps_saved_index(self, model, user_features):
+        """Test that the search arrays are memory-mapped from the saved index"""
+        model.save_model()
+        loaded = AlertRecommenderModel(model_path=model.model_path)
+
+        assert isinstance(loaded._X_norm, np.memmap)
+        assert isinstance(loaded._alert_matrix, np.memmap)
+        np.testing.assert_array_equal(loaded._X_norm, model._X_norm)
+        assert loaded.recommend_for_users(
+            ['user-5', 'user-0'], user_features, k_neighbors=2
+        ) == model.recommend_for_users(
+            ['user-5', 'user-0'], user_features, k_neighbors=2
+        )
+
+    def test_load_rebuilds_arrays_for_stale_index(self, model, user_features):
+        """Test that an index written for another model file is not used"""
+        model.save_model()
+        index_path = model._index_path()
+        joblib.dump({**joblib.load(index_path), 'token': 'stale'}, index_path)
+
+        loaded = AlertRecommenderModel(model_path=model.model_path)
+
+        assert not isinstance(loaded._X_norm, np.memmap)
+        np.testing.assert_allclose(loaded._X_norm, model._X_norm)
+
+    def test_search_matrices_are_float32(self, model):
+        """Test that the fitted KNN and search index keep float32 features"""
+        assert model.knn._fit_X.dtype == np.float32
+        assert model._X_scaled.dtype == np.float32
+        assert model._X_norm.dtype == np.float32
+
+    def test_batch_matches_single_user_recommendations(self, model, user_features):
+        """Test that batched recommendations match per-user recommendations"""
+        user_ids = ['user-5', 'user-0', 'user-3']
+
+        results = model.recommend_for_users(
+            user_ids, user_features, k_neighbors=2, threshold=0.5
+        )
+
+        assert list(results) == user_ids
+        for user_id in user_ids:
+            single = model.recommend_for_user(
+                user_id, user_features, k_neighbors=2, threshold=0.5
+            )
+            batched = results[user_id]
+            assert batched['recommendations'] == single['recommendations']
+            assert [u['user_id'] for u in batched['similar_users']] == [
+                u['user_id'] for u in single['similar_users']
+            ]
+            assert [u['similarity_score'] for u in batched['similar_users']] == (
+                pytest.approx([u['similarity_score'] for u in single['similar_users']])
+            )
+
+    def test_batch_with_unknown_user_raises(self, model, user_features):
+        """Test that a batch containing an unknown user ID is rejected"""
+        with pytest.raises(ValueError, match='missing'):
+            model.recommend_for_users(['user-0', 'missing'], user_features)
+
+    def test_parallel_matches_batch_recommendations(self, model, user_features):
+        """Test that thread-pool scoring returns the same results as one batch"""
+        user_ids = user_features['user_id'].tolist()
+
+        results = model.recommend_for_users_parallel(
+            user_ids, user_features, k_neighbors=2, n_workers=3, batch_size=2
+        )
+
+        assert results == model.recommend_for_users(
+            user_ids, user_features, k_neighbors=2
+        )
+
+    def test_accepts_frame_indexed_by_user_id(self, model, user_features):
+        """Test lookups on a user_id-indexed frame match the plain frame"""
+        indexed = user_features.set_index('user_id')
+
+        assert model.recommend_for_user(
+            'user-5', indexed, k_neighbors=2
+        ) == model.recommend_for_user('user-5', user_features, k_neighbors=2)
+
+    def test_lookup_sees_frame_reordered_in_place(self, model, user_features):
+        """Test that reordering a frame in place still returns the right user"""
+        before = model.recommend_for_user(
+            'user-0', user_features, k_neighbors=2, threshold=0.5
+        )
+
+        user_features.sort_values('user_id', ascending=False, inplace=True)
+        after = model.recommend_for_user(
+            'user-0', user_features, k_neighbors=2, threshold=0.5
+        )
+
+        # user-0 already has new_merchant; user-5's row (now first) does not
+        assert after['recommendations'] == []
+        assert after == before
+
+    def test_recommends_for_user_not_seen_in_training(self, model, user_features):
+        """Test that users added after training are scaled on the fly"""
+        new_user = user_features[user_features['user_id'] == 'user-4'].assign(
+            user_id='user-new', alert_high_spender=0
+        )
+        features = pd.concat([user_features, new_user], ignore_index=True)
+
+        result = model.recommend_for_user(
+            'user-new', features, k_neighbors=2, threshold=0.5
+        )
+
+        # The closest match is user-4's identical training row, which is skipped
+        assert [u['user_id'] for u in result['similar_users']] == ['user-5', 'user-3']
+        assert [r['alert_type'] for r in result['recommendations']] == ['high_spender']
@@ -8,6 +8,8 @@ from fastapi import HTTPException, Request
 import pytest
 
 from src.auth.middleware import (
+    _LOOKUP_BY_EMAIL_STMT,
+    _reset_bypass_cache,
     get_current_user,
     get_dev_fallback_user,
     get_test_user,
@@ -33,7 +35,9 @@ class TestHeaderBasedUserSelection:
     async def test_get_current_user_with_test_header_valid_user(self):
         """Test that get_current_user uses header-specified user when valid"""
         # Setup
-        self.mock_request.headers.get.return_value = 'testuser@example.com'
+        self.mock_request.headers.raw = [
+            (b'x-test-user-email', b'testuser@example.com')
+        ]
 
         with (
             patch('src.auth.middleware.settings') as mock_settings,
@@ -59,13 +63,13 @@ class TestHeaderBasedUserSelection:
             mock_get_test_user.assert_called_once_with(
                 'testuser@example.com', self.mock_session
             )
-            self.mock_request.headers.get.assert_called_once_with('X-Test-User-Email')
+            self.mock_request.headers.get.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_get_current_user_without_test_header_fallback(self):
         """Test that get_current_user falls back to default behavior when no header"""
         # Setup
-        self.mock_request.headers.get.return_value = None
+        self.mock_request.headers.raw = []
 
         with (
             patch('src.auth.middleware.settings') as mock_settings,
@@ -92,7 +96,7 @@ class TestHeaderBasedUserSelection:
     async def test_require_authentication_with_test_header(self):
         """Test that require_authentication uses header-specified user"""
         # Setup
-        self.mock_request.headers.get.return_value = 'admin@example.com'
+        self.mock_request.headers.raw = [(b'x-test-user-email', b'admin@example.com')]
 
         with (
             patch('src.auth.middleware.settings') as mock_settings,
@@ -123,7 +127,9 @@ class TestHeaderBasedUserSelection:
     async def test_production_mode_ignores_test_header(self):
         """Test that test header is ignored in production mode"""
         # Setup
-        self.mock_request.headers.get.return_value = 'testuser@example.com'
+        self.mock_request.headers.raw = [
+            (b'x-test-user-email', b'testuser@example.com')
+        ]
 
         with patch('src.auth.middleware.settings') as mock_settings:
             mock_settings.BYPASS_AUTH = False
@@ -151,33 +157,24 @@ class TestLookupUserByEmail:
         """Test successful user lookup by email"""
         # Setup
         mock_result = Mock()
-        mock_result.scalar_one_or_none.return_value = self.mock_user
+        mock_result.first.return_value = self.mock_user
         self.mock_session.execute.return_value = mock_result
 
-        # Mock the User class and the select operation
-        mock_user_class = Mock()
-        mock_user_class.email = Mock()
-
-        with (
-            patch('src.auth.middleware.User', mock_user_class),
-            patch('src.auth.middleware.select') as mock_select,
-        ):
-            mock_select.return_value.where.return_value = Mock()
-
-            # Execute
-            result = await lookup_user_by_email('test@example.com', self.mock_session)
+        # Execute
+        result = await lookup_user_by_email('test@example.com', self.mock_session)
 
-            # Assert
-            assert result == self.mock_user
-            self.mock_session.execute.assert_called_once()
-            mock_select.assert_called_once_with(mock_user_class)
+        # Assert
+        assert result == self.mock_user
+        self.mock_session.execute.assert_called_once_with(
+            _LOOKUP_BY_EMAIL_STMT, {'email': 'test@example.com'}
+        )
 
     @pytest.mark.asyncio
     async def test_lookup_user_by_email_not_found(self):
         """Test user lookup when user doesn't exist"""
         # Setup
         mock_result = Mock()
-        mock_result.scalar_one_or_none.return_value = None
+        mock_result.first.return_value = None
         self.mock_session.execute.return_value = mock_result
 
         # Mock the User class and the select operation
@@ -282,6 +279,7 @@ class TestGetDevFallbackUser:
     """Test fallback user functionality"""
 
     def setup_method(self):
+        _reset_bypass_cache()
         self.mock_session = AsyncMock()
         self.mock_user = Mock()
         self.mock_user.id = 'user-123'
@@ -292,7 +290,7 @@ class TestGetDevFallbackUser:
         """Test fallback returns first database user when available"""
         # Setup
         mock_result = Mock()
-        mock_result.scalar_one_or_none.return_value = self.mock_user
+        mock_result.first.return_value = self.mock_user
         self.mock_session.execute.return_value = mock_result
 
         # Mock the User class and the select operation
@@ -313,12 +311,36 @@ class TestGetDevFallbackUser:
             assert result['username'] == 'firstuser'
             assert result['is_dev_mode'] is True
 
+    @pytest.mark.asyncio
+    async def test_get_dev_fallback_user_is_cached(self):
+        """Test repeated fallback lookups reuse the cached database user"""
+        # Setup
+        mock_result = Mock()
+        mock_result.first.return_value = self.mock_user
+        self.mock_session.execute.return_value = mock_result
+
+        with (
+            patch('src.auth.middleware.User', Mock()),
+            patch('src.auth.middleware.select'),
+        ):
+            # Execute
+            first = await get_dev_fallback_user(self.mock_session)
+            second = await get_dev_fallback_user(self.mock_session)
+
+            # Assert
+            assert second == first
+            self.mock_session.execute.assert_called_once()
+
+            _reset_bypass_cache()
+            await get_dev_fallback_user(self.mock_session)
+            assert self.mock_session.execute.call_count == 2
+
     @pytest.mark.asyncio
     async def test_get_dev_fallback_user_no_users_in_db(self):
         """Test fallback returns mock user when no users in database"""
         # Setup
         mock_result = Mock()
-        mock_result.scalar_one_or_none.return_value = None
+        mock_result.first.return_value = None
         self.mock_session.execute.return_value = mock_result
 
         with patch('src.auth.middleware.User', self.mock_user.__class__):
@@ -370,7 +392,7 @@ class TestIntegrationScenarios:
     async def test_complete_header_flow_with_existing_user(self):
         """Test complete flow from header to user context with real database user"""
         # Setup - simulate request with test header
-        self.mock_request.headers.get.return_value = 'alice@example.com'
+        self.mock_request.headers.raw = [(b'x-test-user-email', b'alice@example.com')]
 
         # Mock database user
         mock_alice = Mock()
@@ -378,7 +400,7 @@ class TestIntegrationScenarios:
         mock_alice.email = 'alice@example.com'
 
         mock_result = Mock()
-        mock_result.scalar_one_or_none.return_value = mock_alice
+        mock_result.first.return_value = mock_alice
         self.mock_session.execute.return_value = mock_result
 
         # Mock the User class and the select operation
@@ -412,10 +434,12 @@ class TestIntegrationScenarios:
     async def test_error_handling_invalid_user_with_header(self):
         """Test error handling when header specifies non-existent user"""
         # Setup
-        self.mock_request.headers.get.return_value = 'nonexistent@example.com'
+        self.mock_request.headers.raw = [
+            (b'x-test-user-email', b'nonexistent@example.com')
+        ]
 
         mock_result = Mock()
-        mock_result.scalar_one_or_none.return_value = None
+        mock_result.first.return_value = None
         self.mock_session.execute.return_value = mock_result
 
         # Mock the User class and the select operation
@@ -2,8 +2,9 @@
 Tests for JWT authentication middleware
 """
 
+import asyncio
 from datetime import datetime
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
 from fastapi import HTTPException
 from fastapi.security import HTTPAuthorizationCredentials
@@ -13,6 +14,9 @@ import pytest
 # Import from source
 from src.auth.middleware import (
     KeycloakJWTBearer,
+    _location_capture_tasks,
+    _request_headers,
+    _schedule_location_capture,
     get_current_user,
     require_any_role,
     require_authentication,
@@ -165,6 +169,87 @@ class TestAuthDependencies:
         assert user is not None
 
 
+class TestRequestHeaders:
+    """Test the per-request header map used by the auth dependencies"""
+
+    def test_first_occurrence_of_repeated_header_wins(self):
+        """Test that lookups match request.headers.get for repeated headers"""
+        request = Mock()
+        request.headers.raw = [
+            (b'x-test-user-email', b'first@example.com'),
+            (b'authorization', b'Bearer token'),
+            (b'x-test-user-email', b'second@example.com'),
+        ]
+
+        headers = _request_headers(request)
+
+        assert headers == {
+            'x-test-user-email': 'first@example.com',
+            'authorization': 'Bearer token',
+        }
+
+
+class TestDeferredLocationCapture:
+    """Test that location capture runs in the background after authentication"""
+
+    @staticmethod
+    def _request(headers: dict) -> Mock:
+        request = Mock()
+        request.headers.raw = [
+            (name.lower().encode(), value.encode()) for name, value in headers.items()
+        ]
+        return request
+
+    @pytest.mark.asyncio
+    async def test_capture_runs_after_authentication_returns(self):
+        """Test that authentication returns before the location update runs"""
+        started = asyncio.Event()
+        release = asyncio.Event()
+        capture_session = AsyncMock()
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__.return_value = capture_session
+
+        async def slow_capture(request, user, session):
+            started.set()
+            await release.wait()
+
+        request = self._request({'X-User-Latitude': '40.7'})
+        credentials = HTTPAuthorizationCredentials(
+            scheme='Bearer', credentials='valid.token'
+        )
+        with (
+            patch('src.auth.middleware.settings') as mock_settings,
+            patch('src.auth.middleware.get_current_user') as mock_get_user,
+            patch('src.auth.middleware.SessionLocal', session_factory),
+            patch(
+                'src.auth.middleware.update_user_location_on_login',
+                side_effect=slow_capture,
+            ) as mock_update,
+        ):
+            mock_settings.BYPASS_AUTH = False
+            mock_get_user.return_value = {'id': 'user-123', 'roles': ['user']}
+
+            user = await require_authentication(credentials, AsyncMock(), request)
+            assert user['id'] == 'user-123'
+
+            await asyncio.wait_for(started.wait(), timeout=1)
+            release.set()
+            await asyncio.gather(*_location_capture_tasks)
+
+            mock_update.assert_called_once_with(request, user, capture_session)
+
+    @pytest.mark.asyncio
+    async def test_requests_without_location_headers_schedule_nothing(self):
+        """Test that no background task is created without location headers"""
+        with (
+            patch('src.auth.middleware.SessionLocal', MagicMock()),
+            patch('src.auth.middleware.update_user_location_on_login', AsyncMock()),
+        ):
+            _schedule_location_capture(self._request({}), {'id': 'user-123'}, {})
+
+        assert not _location_capture_tasks
+
+
 class TestRoleBasedAuth:
     """Test role-based authentication decorators"""
 
@@ -0,0 +1,65 @@
+"""Tests for ML feature engineering"""
+
+import pandas as pd
+
+from src.services.recommendations.ml.feature_engineering import (
+    apply_alert_labels,
+    extract_alert_labels_by_user,
+    extract_alert_types_from_rules,
+    get_alert_columns,
+)
+
+
+class TestExtractAlertLabelsByUser:
+    """Test suite for vectorized alert label extraction"""
+
+    def test_matches_per_user_extraction(self):
+        """Test that labels match extract_alert_types_from_rules for each user"""
+        rules = pd.DataFrame(
+            {
+                'user_id': ['u1', 'u1', 'u2', 'u3'],
+                'natural_language_query': [
+                    'Alert me when spending exceeds $500',
+                    'Purchase at a NEW MERCHANT',
+                    'Monthly charge from a subscription service',
+                    'Something unrelated',
+                ],
+            }
+        )
+
+        labels = extract_alert_labels_by_user(rules).set_index('user_id')
+
+        assert list(labels.index) == ['u1', 'u2', 'u3']
+        for user_id, user_rules in rules.groupby('user_id'):
+            expected = extract_alert_types_from_rules(user_rules.to_dict('records'))
+            assert labels.loc[user_id].to_dict() == expected
+
+    def test_missing_query_matches_nothing(self):
+        """Test that rules without a query contribute no labels"""
+        rules = pd.DataFrame({'user_id': ['u1'], 'natural_language_query': [None]})
+
+        labels = extract_alert_labels_by_user(rules)
+
+        assert labels[get_alert_columns()].to_numpy().sum() == 0
+
+
+class TestApplyAlertLabels:
+    """Test suite for writing per-user alert labels onto user features"""
+
+    def test_labels_written_to_matching_rows(self):
+        """Test that labels land on each user's row and others default to 0"""
+        features = pd.DataFrame({'user_id': ['u1', 'u2', 'u3'], 'amount_mean': 1.0})
+        rules = pd.DataFrame(
+            {
+                'user_id': ['u3', 'u1', 'unknown'],
+                'natural_language_query': ['new merchant', 'travel', 'large'],
+            }
+        )
+
+        labeled = apply_alert_labels(features, extract_alert_labels_by_user(rules))
+
+        assert list(labeled['user_id']) == ['u1', 'u2', 'u3']
+        assert list(labeled['alert_location_based']) == [1, 0, 0]
+        assert list(labeled['alert_new_merchant']) == [0, 0, 1]
+        assert labeled['alert_large_transaction'].sum() == 0
+        assert set(get_alert_columns()) <= set(labeled.columns)
@@ -1,11 +1,17 @@
 """Tests for ML Inference Client"""
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
+import orjson
 import pytest
 
-from src.services.recommendations.ml_inference_client import MLInferenceClient
+from src.services.recommendations.ml_inference_client import (
+    MLInferenceClient,
+    close_inference_client,
+    run_inference_sync,
+)
 
 
 class TestMLInferenceClient:
@@ -63,16 +69,18 @@ class TestMLInferenceClient:
     async def test_get_recommendations_success(self, client, sample_user_features):
         """Test successful recommendation retrieval"""
         mock_response = MagicMock()
-        mock_response.json.return_value = {
-            'outputs': [
-                {
-                    'name': 'output-0',
-                    'datatype': 'FP64',
-                    'data': [[0.8, 0.6, 0.3]],
-                }
-            ],
-            'parameters': {'some': 'metadata'},
-        }
+        mock_response.content = orjson.dumps(
+            {
+                'outputs': [
+                    {
+                        'name': 'output-0',
+                        'datatype': 'FP64',
+                        'data': [[0.8, 0.6, 0.3]],
+                    }
+                ],
+                'parameters': {'some': 'metadata'},
+            }
+        )
         mock_response.raise_for_status = MagicMock()
 
         with patch('httpx.AsyncClient') as mock_client_class:
@@ -97,9 +105,9 @@ class TestMLInferenceClient:
         feature_list = [150.0, 25.0, 12.0, 50.0, 500.0]
 
         mock_response = MagicMock()
-        mock_response.json.return_value = {
-            'outputs': [{'name': 'predictions', 'data': [[0.7, 0.5]]}]
-        }
+        mock_response.content = orjson.dumps(
+            {'outputs': [{'name': 'predictions', 'data': [[0.7, 0.5]]}]}
+        )
         mock_response.raise_for_status = MagicMock()
 
         with patch('httpx.AsyncClient') as mock_client_class:
@@ -113,7 +121,7 @@ class TestMLInferenceClient:
             assert 'recommendations' in result
             # Verify the request data structure
             call_args = mock_client.post.call_args
-            request_data = call_args.kwargs['json']
+            request_data = orjson.loads(call_args.kwargs['content'])
             assert request_data['inputs'][0]['data'] == [feature_list]
 
     @pytest.mark.asyncio
@@ -146,7 +154,7 @@ class TestMLInferenceClient:
     ):
         """Test handling of invalid response format"""
         mock_response = MagicMock()
-        mock_response.json.return_value = {'invalid': 'format'}
+        mock_response.content = orjson.dumps({'invalid': 'format'})
         mock_response.raise_for_status = MagicMock()
 
         with patch('httpx.AsyncClient') as mock_client_class:
@@ -166,7 +174,7 @@ class TestMLInferenceClient:
     async def test_get_recommendations_empty_features(self, client):
         """Test recommendations with empty features"""
         mock_response = MagicMock()
-        mock_response.json.return_value = {'outputs': [{'data': [[]]}]}
+        mock_response.content = orjson.dumps({'outputs': [{'data': [[]]}]})
         mock_response.raise_for_status = MagicMock()
 
         with patch('httpx.AsyncClient') as mock_client_class:
@@ -188,9 +196,9 @@ class TestMLInferenceClient:
     ):
         """Test recommendation filtering by threshold"""
         mock_response = MagicMock()
-        mock_response.json.return_value = {
-            'outputs': [{'name': 'predictions', 'data': [[0.8, 0.6, 0.3, 0.2, 0.1]]}]
-        }
+        mock_response.content = orjson.dumps(
+            {'outputs': [{'name': 'predictions', 'data': [[0.8, 0.6, 0.3, 0.2, 0.1]]}]}
+        )
         mock_response.raise_for_status = MagicMock()
 
         with patch('httpx.AsyncClient') as mock_client_class:
@@ -205,7 +213,7 @@ class TestMLInferenceClient:
 
             # Verify threshold was passed in request
             call_args = mock_client.post.call_args
-            request_data = call_args.kwargs['json']
+            request_data = orjson.loads(call_args.kwargs['content'])
             assert request_data['parameters']['threshold'] == 0.5
 
     @pytest.mark.asyncio
@@ -214,7 +222,7 @@ class TestMLInferenceClient:
     ):
         """Test that request follows MLServer V2 format"""
         mock_response = MagicMock()
-        mock_response.json.return_value = {'outputs': [{'data': [[0.5]]}]}
+        mock_response.content = orjson.dumps({'outputs': [{'data': [[0.5]]}]})
         mock_response.raise_for_status = MagicMock()
 
         with patch('httpx.AsyncClient') as mock_client_class:
@@ -236,11 +244,12 @@ class TestMLInferenceClient:
             assert 'test-inference-service' in url
 
             # Check request data format (MLServer V2)
-            request_data = call_args.kwargs['json']
+            request_data = orjson.loads(call_args.kwargs['content'])
             assert 'inputs' in request_data
             assert len(request_data['inputs']) == 1
             assert request_data['inputs'][0]['name'] == 'input-0'
-            assert request_data['inputs'][0]['datatype'] == 'FP64'
+            assert request_data['inputs'][0]['datatype'] == 'FP32'
+            assert request_data['inputs'][0]['shape'] == [1, 5]
             assert 'shape' in request_data['inputs'][0]
             assert 'data' in request_data['inputs'][0]
 
@@ -248,3 +257,123 @@ class TestMLInferenceClient:
             assert 'parameters' in request_data
             assert request_data['parameters']['k_neighbors'] == 3
             assert request_data['parameters']['threshold'] == 0.4
+
+    @pytest.mark.asyncio
+    async def test_http_client_reused_across_calls(self, client, sample_user_features):
+        """Test that one pooled HTTP client serves every request"""
+        mock_response = MagicMock()
+        mock_response.content = orjson.dumps({'outputs': [{'data': [[0.5]]}]})
+        mock_response.raise_for_status = MagicMock()
+        mock_response.status_code = 200
+
+        with patch('httpx.AsyncClient') as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.post.return_value = mock_response
+            mock_client.get.return_value = mock_response
+            mock_client_class.return_value = mock_client
+
+            await client.get_recommendations(user_features=sample_user_features)
+            await client.get_recommendations(user_features=sample_user_features)
+            assert await client.health_check() is True
+
+            mock_client_class.assert_called_once()
+            assert mock_client.post.call_count == 2
+
+            await client.aclose()
+            mock_client.aclose.assert_awaited_once()
+
+    def test_sync_calls_share_background_loop_client(
+        self, client, sample_user_features
+    ):
+        """Test that synchronous callers reuse one client on the background loop"""
+        mock_response = MagicMock()
+        mock_response.content = orjson.dumps({'outputs': [{'data': [[0.5]]}]})
+        mock_response.raise_for_status = MagicMock()
+
+        with patch('httpx.AsyncClient') as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.post.return_value = mock_response
+            mock_client_class.return_value = mock_client
+
+            for _ in range(2):
+                result = run_inference_sync(
+                    client.get_recommendations(user_features=sample_user_features)
+                )
+                assert result['recommendations'] == [0.5]
+
+            mock_client_class.assert_called_once()
+            run_inference_sync(client.aclose())
+            mock_client.aclose.assert_awaited_once()
+
+        asyncio.run(close_inference_client())
+
+    @pytest.mark.asyncio
+    async def test_aclose_skips_client_of_closed_loop(self, client):
+        """Test that closing tolerates a client bound to a closed loop"""
+        stale_loop = asyncio.new_event_loop()
+        stale_loop.close()
+        stale_client = AsyncMock()
+        client._clients[stale_loop] = stale_client
+
+        with patch('httpx.AsyncClient') as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client_class.return_value = mock_client
+
+            assert client._get_client() is mock_client
+            assert stale_loop not in client._clients
+
+            await client.aclose()
+
+        mock_client.aclose.assert_awaited_once()
+        stale_client.aclose.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_features_sent_in_model_schema_order(self, client):
+        """Test that schema features are ordered by name, not dict insertion"""
+        features = {
+            name: float(i) for i, name in enumerate(MLInferenceClient.FEATURE_ORDER)
+        }
+        shuffled = dict(reversed(list(features.items())))
+
+        mock_response = MagicMock()
+        mock_response.content = orjson.dumps({'outputs': [{'data': [[]]}]})
+        mock_response.raise_for_status = MagicMock()
+
+        with patch('httpx.AsyncClient') as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.post.return_value = mock_response
+            mock_client_class.return_value = mock_client
+
+            await client.get_recommendations(user_features=shuffled)
+
+            request_data = orjson.loads(mock_client.post.call_args.kwargs['content'])
+            assert request_data['inputs'][0]['data'] == [list(features.values())]
+
+    @pytest.mark.asyncio
+    async def test_get_recommendations_batch(self, client, sample_user_features):
+        """Test that several users are scored in one request"""
+        mock_response = MagicMock()
+        mock_response.content = orjson.dumps(
+            {'outputs': [{'name': 'predictions', 'data': [['a'], ['b']]}]}
+        )
+        mock_response.raise_for_status = MagicMock()
+
+        with patch('httpx.AsyncClient') as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client.post.return_value = mock_response
+            mock_client_class.return_value = mock_client
+
+            results = await client.get_recommendations_batch(
+                [
+                    ('user-1', sample_user_features),
+                    ('user-2', sample_user_features),
+                    ('user-3', sample_user_features),
+                ]
+            )
+
+            mock_client.post.assert_called_once()
+            request_data = orjson.loads(mock_client.post.call_args.kwargs['content'])
+            assert request_data['inputs'][0]['shape'] == [3, 5]
+            assert [r['user_id'] for r in results] == ['user-1', 'user-2', 'user-3']
+            # Rows missing from the response get no recommendations
+            assert [r['recommendations'] for r in results] == [['a'], ['b'], []]
@@ -0,0 +1,148 @@
+"""Tests for ML model training helpers"""
+
+import asyncio
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from src.services.recommendations.ml import training
+from src.services.recommendations.ml.training import should_retrain_model
+
+
+class TestShouldRetrainModel:
+    """Test suite for the model staleness check"""
+
+    @pytest.fixture(autouse=True)
+    def clear_mtime_cache(self):
+        """Start every test with an empty mtime cache"""
+        training._mtime_cache.clear()
+        yield
+        training._mtime_cache.clear()
+
+    def test_missing_model_needs_training(self, tmp_path):
+        """Test that a missing model file always needs training"""
+        assert should_retrain_model(str(tmp_path / 'missing.pkl')) is True
+
+    def test_fresh_and_stale_models(self, tmp_path):
+        """Test that model age is compared against the threshold"""
+        fresh = tmp_path / 'fresh.pkl'
+        stale = tmp_path / 'stale.pkl'
+        fresh.touch()
+        stale.touch()
+        ten_days_ago = time.time() - 10 * 24 * 3600
+        os.utime(stale, (ten_days_ago, ten_days_ago))
+
+        assert should_retrain_model(str(fresh), days_threshold=7) is False
+        assert should_retrain_model(str(stale), days_threshold=7) is True
+
+    def test_mtime_is_cached_between_checks(self, tmp_path, monkeypatch):
+        """Test that repeated checks within the TTL skip the stat call"""
+        model_path = tmp_path / 'model.pkl'
+        model_path.touch()
+        calls = []
+        real_getmtime = os.path.getmtime
+
+        def counting_getmtime(path):
+            calls.append(path)
+            return real_getmtime(path)
+
+        monkeypatch.setattr(training.os.path, 'getmtime', counting_getmtime)
+
+        for _ in range(3):
+            assert should_retrain_model(str(model_path)) is False
+
+        assert calls == [str(model_path)]
+
+
+class TestFeatureCache:
+    """Test suite for the cached feature matrix stored beside the model"""
+
+    def test_round_trip_with_matching_signature(self, tmp_path):
+        """Test that cached features are reused only for the same source data"""
+        cache_path = training._feature_cache_path(str(tmp_path / 'model_knn.pkl'))
+        features = pd.DataFrame({'user_id': ['u1'], 'amount_mean': [1.5]})
+
+        training.save_cached_features(cache_path, (1, 10, 'ts'), features)
+
+        assert cache_path == str(tmp_path / 'model_knn_features.joblib')
+        pd.testing.assert_frame_equal(
+            training.load_cached_features(cache_path, (1, 10, 'ts')), features
+        )
+        assert training.load_cached_features(cache_path, (1, 11, 'ts')) is None
+
+    def test_missing_cache(self, tmp_path):
+        """Test that a missing cache file is treated as a cache miss"""
+        cache_path = str(tmp_path / 'missing_features.joblib')
+
+        assert training.load_cached_features(cache_path, (1,)) is None
+
+
+class TestTrainingDataHash:
+    """Test suite for the training data content hash"""
+
+    def test_hash_tracks_labels_and_settings(self):
+        """Test that the hash changes only when the training input changes"""
+        features = pd.DataFrame(
+            {'user_id': ['u1', 'u2'], 'amount_mean': [1.0, 2.0], 'alert_x': [0, 1]}
+        )
+        relabeled = features.assign(alert_x=[1, 1])
+
+        digest = training._training_data_hash(features, n_neighbors=5)
+
+        assert digest == training._training_data_hash(features.copy(), n_neighbors=5)
+        assert digest != training._training_data_hash(relabeled, n_neighbors=5)
+        assert digest != training._training_data_hash(features, n_neighbors=3)
+
+
+class TestTrainModel:
+    """Test suite for train_model"""
+
+    @pytest.mark.asyncio
+    async def test_fit_runs_off_the_event_loop(self, tmp_path, monkeypatch):
+        """Test that labelling and fitting do not block the event loop thread"""
+        features = pd.DataFrame({'user_id': ['u1'], 'amount_mean': [1.5]})
+        fit_threads = []
+
+        async def signature(session):
+            return (1,)
+
+        def fit(model, user_features, alert_rules, n_neighbors, skip_if_unchanged):
+            fit_threads.append(threading.get_ident())
+            return model
+
+        monkeypatch.setattr(training, '_feature_source_signature', signature)
+        monkeypatch.setattr(training, 'load_cached_features', lambda *a: features)
+        monkeypatch.setattr(training, '_fit_model', fit)
+
+        await training.train_model(
+            None, model_path=str(tmp_path / 'model.pkl'), use_real_alerts=False
+        )
+
+        assert len(fit_threads) == 1
+        assert fit_threads[0] != threading.get_ident()
+
+
+class TestLogUserAlertAction:
+    """Test suite for alert action logging and debounced retrain checks"""
+
+    @pytest.mark.asyncio
+    async def test_burst_of_actions_runs_one_retrain_check(self, monkeypatch):
+        """Test that actions return immediately and share one retrain check"""
+        checks = []
+        monkeypatch.setattr(training, 'RETRAIN_DEBOUNCE_SECONDS', 0.01)
+        monkeypatch.setattr(
+            training, 'should_retrain_model', lambda path: checks.append(path)
+        )
+
+        try:
+            for action in ('created', 'disabled', 'enabled'):
+                await training.log_user_alert_action(None, 'u1', 'r1', action)
+            assert checks == []
+
+            await asyncio.sleep(0.1)
+            assert checks == [training.DEFAULT_MODEL_PATH]
+        finally:
+            await training.stop_retrain_worker()
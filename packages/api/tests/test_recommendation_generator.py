@@ -0,0 +1,105 @@
+"""Tests for ML Recommendation Generator"""
+
+import pytest
+
+from src.services.recommendations.ml.recommendation_generator import (
+    combine_recommendations,
+    generate_transaction_based_recommendations,
+)
+
+
+class TestRecommendationGenerator:
+    """Test suite for transaction-based recommendation generation"""
+
+    @pytest.fixture
+    def transaction_analysis(self):
+        """Analysis that qualifies for every transaction-based recommendation"""
+        return {
+            'total_transactions': 120,
+            'spending_patterns': {'mean': 80.0},
+            'category_behavior': {
+                'top_categories_spending': {
+                    'Shopping': {'mean': 120.0},
+                    'Food & Dining': {'mean': 25.0},
+                }
+            },
+            'merchant_patterns': {
+                'recurring_merchants': {
+                    'Netflix': {'is_likely_subscription': True},
+                    'Starbucks': {'is_likely_subscription': False},
+                },
+                'merchant_diversity': 0.5,
+            },
+            'location_patterns': {'travels_frequently': True, 'home_state': 'CA'},
+            'temporal_patterns': {'avg_weekly_spending': 400.0, 'weeks_with_data': 4},
+            'anomaly_thresholds': {
+                'single_transaction': 250.0,
+                'weekly_spending': 600.0,
+                'category_thresholds': {'Shopping': 300.0, 'Food & Dining': 60.0},
+            },
+        }
+
+    def test_returns_top_five_by_confidence(self, transaction_analysis):
+        """Test that only the five most confident recommendations are returned"""
+        recommendations = generate_transaction_based_recommendations(
+            'user-1', {}, transaction_analysis
+        )
+
+        assert [r['title'] for r in recommendations] == [
+            'Large Transaction Alert',
+            'Weekly Spending Limit Alert',
+            'Shopping Spending Alert',
+            'Food & Dining Spending Alert',
+            'Subscription Price Change Alert',
+        ]
+        assert [r['confidence'] for r in recommendations] == [
+            0.9,
+            0.85,
+            0.8,
+            0.8,
+            0.75,
+        ]
+
+    def test_renders_personalized_text(self, transaction_analysis):
+        """Test that rendered recommendations include the user's thresholds"""
+        recommendations = generate_transaction_based_recommendations(
+            'user-1', {}, transaction_analysis
+        )
+
+        large_tx = recommendations[0]
+        assert large_tx['threshold_amount'] == 250.0
+        assert '$250.00' in large_tx['natural_language_query']
+        assert 'avg: $80.00' in large_tx['reasoning']
+
+        assert recommendations[2]['priority'] == 'high'
+        assert recommendations[3]['priority'] == 'medium'
+        assert 'Netflix' in recommendations[4]['reasoning']
+
+    def test_new_user_gets_default_recommendations(self):
+        """Test that users without transactions get default recommendations"""
+        recommendations = generate_transaction_based_recommendations(
+            'user-1', {'location_consent_given': False}, {'total_transactions': 0}
+        )
+
+        assert len(recommendations) == 3
+        assert recommendations[0]['title'] == 'Large Transaction Alert'
+
+    def test_combine_recommendations_scores_by_source(self):
+        """Test that combined recommendations are tagged, weighted and ranked"""
+        combined = combine_recommendations(
+            transaction_based=[
+                {'title': 'Large Transaction Alert', 'confidence': 0.9},
+                {'title': 'Weekly Spending Limit Alert'},
+            ],
+            collaborative_filtering=[
+                {'title': 'Large Transaction Alert', 'probability': 1.0},
+                {'title': 'New Merchant Alert', 'probability': 0.8},
+            ],
+        )
+
+        assert [(r['title'], r['source']) for r in combined] == [
+            ('Large Transaction Alert', 'transaction_analysis'),
+            ('Weekly Spending Limit Alert', 'transaction_analysis'),
+            ('New Merchant Alert', 'collaborative_filtering'),
+        ]
+        assert [r['final_score'] for r in combined] == pytest.approx([0.63, 0.35, 0.24])
@@ -13,6 +13,7 @@ Usage:
     python train_ml_model.py
 """
 
+import hashlib
 import os
 from pathlib import Path
 import sys
@@ -28,17 +29,39 @@ from src.services.recommendations.ml.feature_engineering import (
     get_alert_columns,
 )
 from src.services.recommendations.ml.recommender import AlertRecommenderModel
+from src.services.recommendations.ml.training import (
+    FEATURE_CACHE_VERSION,
+    load_cached_features,
+    save_cached_features,
+)
+
+DATA_DIR = Path(__file__).parent.parent.parent / 'data'
+FEATURE_CACHE_DIR = Path('/tmp/ml_cache')
+
+# Only the columns build_user_features reads, with explicit dtypes so
+# read_csv skips type inference and the unused columns entirely
+USER_DTYPES = {'id': str, 'credit_limit': 'float64', 'credit_balance': 'float64'}
+TRANSACTION_DTYPES = {
+    'user_id': str,
+    'amount': 'float64',
+    'merchant_name': 'category',
+    'merchant_category': 'category',
+}
 
 
 def load_data():
     """Load users and transactions from CSV files"""
-    data_dir = Path(__file__).parent.parent.parent / 'data'
-
-    print(f'Loading data from {data_dir}...')
+    print(f'Loading data from {DATA_DIR}...')
 
     # Load CSV files
-    users_df = pd.read_csv(data_dir / 'sample_users.csv')
-    transactions_df = pd.read_csv(data_dir / 'sample_transactions.csv')
+    users_df = pd.read_csv(
+        DATA_DIR / 'sample_users.csv', usecols=list(USER_DTYPES), dtype=USER_DTYPES
+    )
+    transactions_df = pd.read_csv(
+        DATA_DIR / 'sample_transactions.csv',
+        usecols=list(TRANSACTION_DTYPES),
+        dtype=TRANSACTION_DTYPES,
+    )
 
     print(f'✅ Loaded {len(users_df)} users')
     print(f'✅ Loaded {len(transactions_df)} transactions')
@@ -46,20 +69,48 @@ def load_data():
     return users_df, transactions_df
 
 
-def train_model():
-    """Main training function"""
-    print('=' * 60)
-    print('ML Alert Recommendation Model Training')
-    print('=' * 60)
+def _csv_signature() -> tuple:
+    """Content hash of the sample CSV files the features are built from"""
+    digest = hashlib.blake2b(digest_size=16)
+    for name in ('sample_users.csv', 'sample_transactions.csv'):
+        digest.update((DATA_DIR / name).read_bytes())
+    return (FEATURE_CACHE_VERSION, digest.hexdigest())
+
+
+def _feature_cache_path() -> str:
+    """Feature cache file of this checkout's data directory"""
+    key = hashlib.blake2b(str(DATA_DIR.resolve()).encode(), digest_size=8)
+    return str(FEATURE_CACHE_DIR / f'sample_features_{key.hexdigest()}.joblib')
+
+
+def load_user_features():
+    """Build user features from the CSVs, reusing the cache if they are unchanged"""
+    cache_path = _feature_cache_path()
+    signature = _csv_signature()
+    user_features = load_cached_features(cache_path, signature)
+    if user_features is not None:
+        print(f'✅ Loaded cached features for {len(user_features)} users')
+        return user_features
 
-    # Load data
     users_df, transactions_df = load_data()
 
-    # Build user behavioral features
     print('\n📊 Building user behavioral features...')
     user_features = build_user_features(users_df, transactions_df)
     print(f'✅ Built features for {len(user_features)} users')
 
+    save_cached_features(cache_path, signature, user_features)
+    return user_features
+
+
+def train_model():
+    """Main training function"""
+    print('=' * 60)
+    print('ML Alert Recommendation Model Training')
+    print('=' * 60)
+
+    # Load data and build user behavioral features
+    user_features = load_user_features()
+
     # Generate heuristic-based alert labels
     print('\n🏷️  Generating heuristic-based alert labels...')
     user_features_with_alerts = generate_initial_alert_labels(user_features)
@@ -67,20 +118,30 @@ def train_model():
 
     # Show alert distribution
     alert_cols = get_alert_columns()
-    existing_alert_cols = [
-        col for col in alert_cols if col in user_features_with_alerts.columns
-    ]
+    existing_cols = set(user_features_with_alerts.columns)
+    existing_alert_cols = [col for col in alert_cols if col in existing_cols]
 
     print('\n📈 Alert distribution (heuristic-based):')
-    for col in existing_alert_cols:
-        count = user_features_with_alerts[col].sum()
+    counts = user_features_with_alerts[existing_alert_cols].sum(axis=0)
+    for col, count in counts.items():
         pct = (count / len(user_features_with_alerts)) * 100
         print(f'  {col}: {int(count)} users ({pct:.1f}%)')
 
-    # Ensure all alert columns exist
-    for alert_col in alert_cols:
-        if alert_col not in user_features_with_alerts.columns:
-            user_features_with_alerts[alert_col] = 0
+    # Ensure all alert columns exist, adding the missing ones in one block
+    missing_alert_cols = [col for col in alert_cols if col not in existing_cols]
+    if missing_alert_cols:
+        user_features_with_alerts = pd.concat(
+            [
+                user_features_with_alerts,
+                pd.DataFrame(
+                    0,
+                    index=user_features_with_alerts.index,
+                    columns=missing_alert_cols,
+                    dtype='int8',
+                ),
+            ],
+            axis=1,
+        )
 
     # Train KNN model
     print('\n🤖 Training KNN model...')
@@ -4,8 +4,31 @@ Keycloak management package.
 Provides a consolidated interface for managing Keycloak realms, users, and authentication.
 """
 
-from .client import KeycloakClient
-from .realm import RealmManager
-from .users import UserManager
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .client import KeycloakClient
+    from .realm import RealmManager
+    from .users import UserManager
 
 __all__ = ['KeycloakClient', 'RealmManager', 'UserManager']
+
+# Submodule of each export, imported on first attribute access
+_LAZY_IMPORTS = {
+    'KeycloakClient': '.client',
+    'RealmManager': '.realm',
+    'UserManager': '.users',
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *__all__])
@@ -6,63 +6,176 @@ Consolidated interface for all Keycloak operations.
 """
 
 import argparse
+import functools
 import http.client
 import os
+import random
+import selectors
+import socket
 import sys
 import time
 from urllib.parse import urlparse
 
-from .realm import RealmManager
-from .users import UserManager
+# RealmManager/UserManager (and requests) are imported inside the commands that
+# use them, so `wait` starts without loading the HTTP client stack
 
 
-def wait_for_keycloak(max_attempts: int = 60, interval: int = 2) -> int:
+def _resolve_address(host: str, port: int) -> tuple[int, tuple] | None:
+    """Resolve host once so repeated probes skip DNS; None until it resolves."""
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except OSError:
+        return None
+    family, _, _, _, sockaddr = infos[0]
+    return family, sockaddr
+
+
+def _http_ready(sockaddr: tuple, host_header: str) -> bool | None:
+    """
+    GET / and report whether Keycloak answered with a ready status.
+
+    Returns None when the server responded but is still starting.
+    """
+    # Make a simple HTTP connection without following redirects
+    conn = http.client.HTTPConnection(*sockaddr[:2], timeout=2)
+    try:
+        conn.request('GET', '/', headers={'Host': host_header})
+        response = conn.getresponse()
+    finally:
+        conn.close()
+
+    # Accept any response (200, 302, etc.) - just need to know Keycloak is responding
+    return True if response.status in (200, 302, 303, 307, 308) else None
+
+
+def _any_port_open(addresses: list[tuple[int, tuple]], timeout: float = 1.0) -> bool:
+    """
+    Check whether any address accepts TCP connections.
+
+    All connects are started at once without blocking and the first one to
+    complete wins, so several Keycloak endpoints cost one probe's latency.
+    """
+    with selectors.DefaultSelector() as selector:
+        try:
+            for family, sockaddr in addresses:
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                selector.register(sock, selectors.EVENT_WRITE)
+                sock.setblocking(False)
+                sock.connect_ex(sockaddr)
+
+            deadline = time.monotonic() + timeout
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                for key, _ in selector.select(remaining):
+                    sock = key.fileobj
+                    if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                        return True
+                    # Refused or unreachable; keep waiting on the others
+                    selector.unregister(sock)
+                    sock.close()
+            return False
+        finally:
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+
+
+def wait_for_keycloak(
+    max_wait_seconds: float = 120.0,
+    base_delay: float = 0.2,
+    max_delay: float = 5.0,
+    deep_check: bool = False,
+) -> int:
     """Wait for Keycloak to be ready.
 
+    Probes with exponential backoff and jitter: the first retries come quickly,
+    and the delay doubles up to max_delay while Keycloak is still starting.
+    Probes KEYCLOAK_URL, or the comma-separated endpoints in
+    KEYCLOAK_PROBE_URLS (e.g. pods or ingress paths) when set; Keycloak is
+    ready as soon as any of them is.
+
     Args:
-        max_attempts: Maximum number of connection attempts
-        interval: Seconds to wait between attempts
+        max_wait_seconds: Total time to wait before giving up
+        base_delay: Seconds to wait after the first failed probe
+        max_delay: Upper bound on the wait between probes
+        deep_check: Require an HTTP response instead of an open TCP port
 
     Returns:
         0 if Keycloak is ready, 1 otherwise
     """
-    keycloak_url = os.getenv('KEYCLOAK_URL', 'http://localhost:8080')
-
-    print(f'⏳ Waiting for Keycloak at {keycloak_url}...')
-
-    # Parse URL
-    parsed = urlparse(keycloak_url)
-    host = parsed.hostname or 'localhost'
-    port = parsed.port or (443 if parsed.scheme == 'https' else 80)
-
-    for attempt in range(1, max_attempts + 1):
+    # KEYCLOAK_URL is the single admin API URL; only the probe list may hold several
+    probe_urls = os.getenv('KEYCLOAK_PROBE_URLS', '').split(',')
+    urls = [url.strip() for url in probe_urls if url.strip()] or [
+        os.getenv('KEYCLOAK_URL', 'http://localhost:8080')
+    ]
+
+    print(f'⏳ Waiting for Keycloak at {", ".join(urls)}...')
+
+    # Parse URLs into (host, port) targets
+    targets = []
+    for url in urls:
+        parsed = urlparse(url.strip())
+        host = parsed.hostname or 'localhost'
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        targets.append((host, port))
+
+    deadline = time.monotonic() + max_wait_seconds
+    addresses: dict[int, tuple[int, tuple]] = {}
+    attempt = 0
+    backoff_step = 0
+
+    while True:
+        attempt += 1
         try:
-            # Make a simple HTTP connection without following redirects
-            conn = http.client.HTTPConnection(host, port, timeout=2)
-            conn.request('GET', '/')
-            response = conn.getresponse()
-            conn.close()
-
-            # Accept any response (200, 302, etc.) - just need to know Keycloak is responding
-            if response.status in (200, 302, 303, 307, 308):
+            for index, (host, port) in enumerate(targets):
+                if index not in addresses:
+                    address = _resolve_address(host, port)
+                    if address:
+                        addresses[index] = address
+
+            if deep_check:
+                ready = False
+                for index, (_, sockaddr) in addresses.items():
+                    host, port = targets[index]
+                    try:
+                        ready = _http_ready(sockaddr, f'{host}:{port}')
+                    except (OSError, http.client.HTTPException):
+                        continue
+                    if ready:
+                        break
+                    # The server is up but still starting; poll quickly again
+                    backoff_step = 0
+            else:
+                ready = bool(addresses) and _any_port_open(list(addresses.values()))
+
+            if ready:
                 print('   ✅ Keycloak is ready!')
                 return 0
 
         except Exception:
             pass
 
-        if attempt < max_attempts:
-            print(
-                f'   Attempt {attempt}/{max_attempts}: Keycloak not ready, waiting {interval}s...'
-            )
-            time.sleep(interval)
+        delay = min(max_delay, base_delay * 2**backoff_step)
+        delay += random.uniform(0, 0.1 * delay)
+        backoff_step += 1
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        delay = min(delay, remaining)
+        print(f'   Attempt {attempt}: Keycloak not ready, waiting {delay:.1f}s...')
+        time.sleep(delay)
 
-    print(f'   ⚠️  Keycloak not ready after {max_attempts * interval} seconds')
+    print(f'   ⚠️  Keycloak not ready after {max_wait_seconds:g} seconds')
     return 1
 
 
 def setup_realm(sync_db_users: bool = False) -> int:
     """Set up Keycloak realm with configuration."""
+    from .realm import RealmManager
+    from .users import UserManager
+
     realm_mgr = RealmManager()
 
     # Setup realm
@@ -70,8 +183,7 @@ def setup_realm(sync_db_users: bool = False) -> int:
         return 1
 
     # Create test users
-    user_mgr = UserManager()
-    user_mgr.access_token = realm_mgr.access_token  # Reuse token
+    user_mgr = UserManager(realm_mgr)  # Reuse session and token
 
     if not user_mgr.create_test_users():
         realm_mgr.log('⚠️  Failed to create test users', 'WARNING')
@@ -103,6 +215,8 @@ def list_users(include_test_users: bool = False) -> int:
         include_test_users: If True, show test users (adminuser, testuser).
                            If False, only show database-synced users.
     """
+    from .users import UserManager
+
     user_mgr = UserManager()
 
     if not user_mgr.get_admin_token():
@@ -113,6 +227,8 @@ def list_users(include_test_users: bool = False) -> int:
 
 def sync_users() -> int:
     """Sync database users to Keycloak."""
+    from .users import UserManager
+
     user_mgr = UserManager()
 
     if not user_mgr.get_admin_token():
@@ -121,8 +237,9 @@ def sync_users() -> int:
     return 0 if user_mgr.sync_from_database() else 1
 
 
-def main():
-    """Main CLI entrypoint."""
+@functools.lru_cache(maxsize=1)
+def _get_parser() -> argparse.ArgumentParser:
+    """Build the argument parser once per process."""
     parser = argparse.ArgumentParser(
         description='Keycloak Management CLI - Consolidated tool for all Keycloak operations',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -145,6 +262,7 @@ Examples:
 
 Environment Variables (from .env.production):
   KEYCLOAK_URL              Keycloak server URL
+  KEYCLOAK_PROBE_URLS       Comma-separated URLs probed by `wait` (default: KEYCLOAK_URL)
   KEYCLOAK_REALM            Realm name (default: spending-monitor)
   KEYCLOAK_CLIENT_ID        Client ID (default: spending-monitor)
   KEYCLOAK_ADMIN            Admin username (default: admin)
@@ -180,18 +298,32 @@ Environment Variables (from .env.production):
     # Wait command
     wait_parser = subparsers.add_parser('wait', help='Wait for Keycloak to be ready')
     wait_parser.add_argument(
-        '--max-attempts',
-        type=int,
-        default=60,
-        help='Maximum number of connection attempts (default: 60)',
+        '--max-wait',
+        type=float,
+        default=120.0,
+        help='Seconds to wait before giving up (default: 120)',
     )
     wait_parser.add_argument(
-        '--interval',
-        type=int,
-        default=2,
-        help='Seconds to wait between attempts (default: 2)',
+        '--max-delay',
+        type=float,
+        default=5.0,
+        help='Longest backoff between attempts in seconds (default: 5)',
     )
+    wait_parser.add_argument(
+        '--deep-check',
+        action='store_true',
+        help='Wait for an HTTP response rather than an open port',
+    )
+    # Fixed-interval options kept for existing scripts; they set the total wait
+    wait_parser.add_argument('--max-attempts', type=int, help=argparse.SUPPRESS)
+    wait_parser.add_argument('--interval', type=float, help=argparse.SUPPRESS)
+
+    return parser
 
+
+def main():
+    """Main CLI entrypoint."""
+    parser = _get_parser()
     args = parser.parse_args()
 
     if not args.command:
@@ -206,9 +338,13 @@ Environment Variables (from .env.production):
     elif args.command == 'sync-users':
         return sync_users()
     elif args.command == 'wait':
+        max_wait = args.max_wait
+        if args.max_attempts is not None:
+            max_wait = args.max_attempts * (args.interval or 2)
         return wait_for_keycloak(
-            max_attempts=args.max_attempts,
-            interval=args.interval,
+            max_wait_seconds=max_wait,
+            max_delay=args.max_delay,
+            deep_check=args.deep_check,
         )
 
     return 1
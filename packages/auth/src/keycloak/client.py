@@ -1,15 +1,91 @@
 """Keycloak API client for authentication and realm management."""
 
+import json
 import os
+import sys
+import threading
 import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+# Keep-alive connections held per host; admin setup makes dozens of calls
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 20
+
+# Independent admin calls issued concurrently; stays within POOL_MAXSIZE
+MAX_PARALLEL_REQUESTS = 8
+
+# Retries for transient gateway errors on idempotent methods only, so POSTs
+# such as user creation and partialImport are never replayed. Once retries
+# run out the last response is returned for callers to check, not raised.
+RETRY_POLICY = Retry(
+    total=3,
+    backoff_factor=0.2,
+    status_forcelist=[502, 503, 504],
+    allowed_methods=frozenset({'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'}),
+    raise_on_status=False,
+)
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Opt-in file for reusing admin tokens across CLI runs; tokens stay in memory
+# only unless KEYCLOAK_TOKEN_CACHE is set
+_token_cache_env = os.getenv('KEYCLOAK_TOKEN_CACHE')
+TOKEN_CACHE_PATH = Path(_token_cache_env).expanduser() if _token_cache_env else None
+TOKEN_EXPIRY_MARGIN_SECONDS = 30
+
+# Serializes token renewal so parallel requests do not each request a new token
+_TOKEN_LOCK = threading.RLock()
+
+
+@dataclass
+class _TokenState:
+    """Admin token shared by every client built from the same root client."""
+
+    access_token: str | None = None
+    expiry: float = 0.0
+    refresh_token: str | None = None
+    refresh_expiry: float = 0.0
+
+
+def _encode_json(kwargs: dict) -> dict:
+    """Serialize a json= payload with orjson and send it as the request body."""
+    if kwargs.get('json') is not None:
+        kwargs['data'] = orjson.dumps(kwargs.pop('json'))
+    return kwargs
 
 
 class KeycloakClient:
     """Base client for Keycloak API operations."""
 
-    def __init__(self):
+    def __init__(self, client: 'KeycloakClient | None' = None):
+        """
+        Read connection settings from the environment.
+
+        Passing an existing client instead shares its settings, connection
+        pool and admin token state by reference, so several managers need one
+        token grant and see each other's renewals.
+        """
+        if client is not None:
+            self.base_url = client.base_url
+            self.admin_username = client.admin_username
+            self.admin_password = client.admin_password
+            self.master_realm = client.master_realm
+            self.app_realm = client.app_realm
+            self.session = client.session
+            self._token = client._token
+            self.connect_timeout = client.connect_timeout
+            self.read_timeout = client.read_timeout
+            self.deadline = client.deadline
+            return
+
         # Determine Keycloak URL based on environment
         # Priority:
         # 1. Always use KEYCLOAK_URL if set (internal/primary URL)
@@ -32,62 +108,261 @@ class KeycloakClient:
         self.admin_password = os.getenv('KEYCLOAK_ADMIN_PASSWORD', 'admin')
         self.master_realm = 'master'
         self.app_realm = os.getenv('KEYCLOAK_REALM', 'spending-monitor')
-        self.access_token: str | None = None
+        self.session = self._create_session()
+        self._token = _TokenState()
+
+        # A slow connect fails fast while large responses get time to arrive
+        self.connect_timeout = float(os.getenv('KEYCLOAK_CONNECT_TIMEOUT', '3'))
+        self.read_timeout = float(os.getenv('KEYCLOAK_READ_TIMEOUT', '30'))
+        # Optional wall-clock bound (seconds) on everything this client does
+        total_deadline = os.getenv('KEYCLOAK_TOTAL_DEADLINE')
+        self.deadline = (
+            time.monotonic() + float(total_deadline) if total_deadline else None
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _create_session() -> requests.Session:
+        """Create an HTTP session that reuses pooled connections to Keycloak."""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=POOL_MAXSIZE,
+            max_retries=RETRY_POLICY,
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+
+    def map_parallel(self, func: Callable, items: Iterable) -> list:
+        """Apply func to each item on a thread pool, returning results in order."""
+        items = list(items)
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        # Renew an expiring token once up front rather than in every worker
+        self._ensure_token()
+        workers = min(MAX_PARALLEL_REQUESTS, len(items))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(func, items))
+
+    @property
+    def access_token(self) -> str | None:
+        return self._token.access_token
+
+    @access_token.setter
+    def access_token(self, token: str | None):
+        # Every request on the session carries the current bearer token
+        self._token.access_token = token
+        if token:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+        else:
+            self.session.headers.pop('Authorization', None)
+
+    # (second, formatted time) of the last log line, shared by all clients
+    _log_timestamp: tuple[int, str] = (0, '')
 
     def log(self, message: str, level: str = 'INFO'):
         """Print formatted log message."""
-        timestamp = time.strftime('%H:%M:%S')
-        print(f'[{timestamp}] {level}: {message}')
+        now = int(time.time())
+        second, timestamp = KeycloakClient._log_timestamp
+        if now != second:
+            # Format at most once per second during bulk operations
+            timestamp = time.strftime('%H:%M:%S', time.localtime(now))
+            KeycloakClient._log_timestamp = (now, timestamp)
+        sys.stdout.write(f'[{timestamp}] {level}: {message}\n')
 
-    def get_admin_token(self) -> bool:
-        """Get admin access token from master realm."""
-        try:
-            url = f'{self.base_url}/realms/{self.master_realm}/protocol/openid-connect/token'
-            data = {
-                'username': self.admin_username,
-                'password': self.admin_password,
-                'grant_type': 'password',
-                'client_id': 'admin-cli',
-            }
-
-            response = requests.post(url, data=data, timeout=10)
-            response.raise_for_status()
-
-            token_data = response.json()
-            self.access_token = token_data['access_token']
-            self.log('✅ Admin token obtained successfully')
-            return True
+    def get_admin_token(self, reuse_token: bool = True) -> bool:
+        """
+        Get admin access token from master realm.
+
+        Reuses an unexpired token (from this client or the on-disk cache) unless
+        reuse_token is False, and prefers a refresh_token grant over a new
+        password grant.
+        """
+        with _TOKEN_LOCK:
+            if reuse_token:
+                if self.access_token and time.time() < self._token.expiry:
+                    return True
+                if self._load_cached_token():
+                    self.log('✅ Reusing cached admin token')
+                    return True
+            if self._refresh_admin_token():
+                self.log('✅ Admin token refreshed successfully')
+                return True
+
+            try:
+                token_data = self._request_token(
+                    {
+                        'username': self.admin_username,
+                        'password': self.admin_password,
+                        'grant_type': 'password',
+                        'client_id': 'admin-cli',
+                    }
+                )
+                self._store_token(token_data)
+                self.log('✅ Admin token obtained successfully')
+                return True
+
+            except Exception as e:
+                self.log(f'❌ Failed to get admin token: {e}', 'ERROR')
+                return False
+
+    def _ensure_token(self):
+        """Renew an admin token that has reached its expiry margin."""
+        if self._token.expiry and time.time() >= self._token.expiry:
+            with _TOKEN_LOCK:
+                if time.time() >= self._token.expiry:
+                    self.get_admin_token()
+
+    def _renew_rejected_token(self, rejected_token: str):
+        """Replace a token the server rejected, once across concurrent callers."""
+        with _TOKEN_LOCK:
+            if self.access_token == rejected_token:
+                self.get_admin_token(reuse_token=False)
+
+    def _timeout(self) -> tuple[float, float]:
+        """(connect, read) timeouts for the next request, within the deadline."""
+        if self.deadline is None:
+            return self.connect_timeout, self.read_timeout
 
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError('KEYCLOAK_TOTAL_DEADLINE exceeded')
+        return min(self.connect_timeout, remaining), min(self.read_timeout, remaining)
+
+    def _request_token(self, data: dict) -> dict:
+        """POST to the master realm token endpoint and return the token response."""
+        url = (
+            f'{self.base_url}/realms/{self.master_realm}/protocol/openid-connect/token'
+        )
+        response = self.session.post(url, data=data, timeout=self._timeout())
+        response.raise_for_status()
+        return response.json()
+
+    def _refresh_admin_token(self) -> bool:
+        """Exchange a still-valid refresh token for a new access token."""
+        if not self._token.refresh_token or time.time() >= self._token.refresh_expiry:
+            return False
+
+        try:
+            token_data = self._request_token(
+                {
+                    'grant_type': 'refresh_token',
+                    'refresh_token': self._token.refresh_token,
+                    'client_id': 'admin-cli',
+                }
+            )
         except Exception as e:
-            self.log(f'❌ Failed to get admin token: {e}', 'ERROR')
+            # 400/401 once the session is gone; fall back to a password grant
+            self.log(f'⚠️  Admin token refresh failed: {e}', 'WARNING')
+            self._token.refresh_token = None
+            return False
+
+        self._store_token(token_data)
+        return True
+
+    def _store_token(self, token_data: dict):
+        """Keep the token response in memory and in the on-disk cache, if enabled."""
+        now = time.time()
+        self.access_token = token_data['access_token']
+        self._token.expiry = (
+            now + token_data.get('expires_in', 60) - TOKEN_EXPIRY_MARGIN_SECONDS
+        )
+        self._token.refresh_token = token_data.get('refresh_token')
+        self._token.refresh_expiry = (
+            now + token_data.get('refresh_expires_in', 0) - TOKEN_EXPIRY_MARGIN_SECONDS
+        )
+        self._save_cached_token()
+
+    def _token_identity(self) -> dict:
+        """Fields a cached token must match to be reused by this client."""
+        return {
+            'base_url': self.base_url,
+            'admin_username': self.admin_username,
+            'master_realm': self.master_realm,
+            'app_realm': self.app_realm,
+        }
+
+    def _load_cached_token(self) -> bool:
+        """Adopt the cached token if it belongs to this client and is still usable."""
+        if TOKEN_CACHE_PATH is None:
+            return False
+
+        try:
+            cached = json.loads(TOKEN_CACHE_PATH.read_text())
+        except (OSError, ValueError):
+            return False
+
+        if cached.get('identity') != self._token_identity():
             return False
 
+        self._token.refresh_token = cached.get('refresh_token')
+        self._token.refresh_expiry = cached.get('refresh_expiry', 0.0)
+        if time.time() >= cached.get('expiry', 0.0):
+            return False
+
+        self.access_token = cached['access_token']
+        self._token.expiry = cached['expiry']
+        return True
+
+    def _save_cached_token(self):
+        """Write the token to the cache file, readable only by the current user."""
+        if TOKEN_CACHE_PATH is None:
+            return
+
+        cached = {
+            'identity': self._token_identity(),
+            'access_token': self.access_token,
+            'expiry': self._token.expiry,
+            'refresh_token': self._token.refresh_token,
+            'refresh_expiry': self._token.refresh_expiry,
+        }
+        tmp_path = TOKEN_CACHE_PATH.with_suffix('.tmp')
+        try:
+            TOKEN_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(cached, f)
+            os.replace(tmp_path, TOKEN_CACHE_PATH)
+        except OSError as e:
+            self.log(f'⚠️  Could not cache admin token: {e}', 'WARNING')
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send an admin API request, retrying once if the token was rejected."""
+        self._ensure_token()
+        token = self.access_token
+        response = self.session.request(
+            method, f'{self.base_url}{path}', timeout=self._timeout(), **kwargs
+        )
+        # A token revoked or expired server-side is renewed without a restart
+        if response.status_code == 401 and token:
+            self._renew_rejected_token(token)
+            response = self.session.request(
+                method, f'{self.base_url}{path}', timeout=self._timeout(), **kwargs
+            )
+        return response
+
     def get(self, path: str, **kwargs) -> requests.Response:
         """Make GET request to Keycloak API."""
-        url = f'{self.base_url}{path}'
-        headers = {'Authorization': f'Bearer {self.access_token}'}
-        return requests.get(url, headers=headers, timeout=10, **kwargs)
+        return self._request('GET', path, **kwargs)
 
     def post(self, path: str, **kwargs) -> requests.Response:
         """Make POST request to Keycloak API."""
-        url = f'{self.base_url}{path}'
-        headers = {
-            'Authorization': f'Bearer {self.access_token}',
-            'Content-Type': 'application/json',
-        }
-        return requests.post(url, headers=headers, timeout=10, **kwargs)
+        return self._request('POST', path, headers=JSON_HEADERS, **_encode_json(kwargs))
 
     def put(self, path: str, **kwargs) -> requests.Response:
         """Make PUT request to Keycloak API."""
-        url = f'{self.base_url}{path}'
-        headers = {
-            'Authorization': f'Bearer {self.access_token}',
-            'Content-Type': 'application/json',
-        }
-        return requests.put(url, headers=headers, timeout=10, **kwargs)
+        return self._request('PUT', path, headers=JSON_HEADERS, **_encode_json(kwargs))
 
     def delete(self, path: str, **kwargs) -> requests.Response:
         """Make DELETE request to Keycloak API."""
-        url = f'{self.base_url}{path}'
-        headers = {'Authorization': f'Bearer {self.access_token}'}
-        return requests.delete(url, headers=headers, timeout=10, **kwargs)
+        return self._request('DELETE', path, **kwargs)
@@ -1,7 +1,6 @@
 """Keycloak realm management operations."""
 
 import os
-import time
 
 from .client import KeycloakClient
 
@@ -9,43 +8,84 @@ from .client import KeycloakClient
 class RealmManager(KeycloakClient):
     """Manages Keycloak realm creation and configuration."""
 
-    def __init__(self):
-        super().__init__()
+    ROLE_NAMES = ['user', 'admin']
+
+    # Settings of the spending-monitor frontend client that do not vary by environment
+    CLIENT_TEMPLATE = {
+        'name': 'Spending Monitor Frontend',
+        'description': 'Frontend application for spending transaction monitoring',
+        'enabled': True,
+        'publicClient': True,
+        'standardFlowEnabled': True,
+        'directAccessGrantsEnabled': True,
+        'serviceAccountsEnabled': False,
+        'implicitFlowEnabled': False,
+        'attributes': {'pkce.code.challenge.method': 'S256'},
+    }
+
+    def __init__(self, client: KeycloakClient | None = None):
+        super().__init__(client)
         self.client_id = os.getenv('KEYCLOAK_CLIENT_ID', 'spending-monitor')
-
-    def _get_redirect_uris(self) -> list[str]:
-        """Get redirect URIs from environment or use defaults."""
-        env_uris = os.getenv('KEYCLOAK_REDIRECT_URIS', '')
-
-        if env_uris:
-            return [uri.strip() for uri in env_uris.split(',')]
-        return ['http://localhost:3000/*']
-
-    def _get_web_origins(self) -> list[str]:
-        """Get web origins from environment or use defaults."""
-        env_origins = os.getenv('KEYCLOAK_WEB_ORIGINS', '')
-        if env_origins:
-            return [origin.strip() for origin in env_origins.split(',')]
-        return ['http://localhost:3000']
-
-    def create_realm(self) -> bool:
-        """Create a new realm for the spending-monitor application."""
+        # Environment is read once; the client representation is reused as-is
+        self.redirect_uris = self._env_list(
+            'KEYCLOAK_REDIRECT_URIS', ['http://localhost:3000/*']
+        )
+        self.web_origins = self._env_list(
+            'KEYCLOAK_WEB_ORIGINS', ['http://localhost:3000']
+        )
+        self.client_data = {
+            **self.CLIENT_TEMPLATE,
+            'clientId': self.client_id,
+            'redirectUris': self.redirect_uris,
+            'webOrigins': self.web_origins,
+        }
+
+    @staticmethod
+    def _env_list(name: str, default: list[str]) -> list[str]:
+        """Comma-separated list from an environment variable, or the default."""
+        value = os.getenv(name, '')
+        if value:
+            return [item.strip() for item in value.split(',')]
+        return default
+
+    @staticmethod
+    def _role_data(role_name: str) -> dict:
+        """Realm role representation."""
+        return {
+            'name': role_name,
+            'description': f'{role_name.capitalize()} role for spending monitor',
+        }
+
+    def create_realm(self) -> bool | None:
+        """
+        Create the realm with its client and roles in a single request.
+
+        Returns True if the realm was created, None if it already exists (its
+        client and roles are then reconciled separately) and False on failure.
+        """
         try:
+            client_data = self.client_data
             realm_data = {
                 'realm': self.app_realm,
                 'enabled': True,
                 'displayName': 'Spending Monitor',
                 'displayNameHtml': '<div class="kc-logo-text"><span>Spending Monitor</span></div>',
+                'clients': [client_data],
+                'roles': {'realm': [self._role_data(role) for role in self.ROLE_NAMES]},
             }
 
             response = self.post('/admin/realms', json=realm_data)
 
             if response.status_code == 201:
                 self.log(f"✅ Realm '{self.app_realm}' created successfully")
+                self.log(f"✅ Client '{self.client_id}' created successfully")
+                self.log(f'   • Redirect URIs: {client_data["redirectUris"]}')
+                self.log(f'   • Web Origins: {client_data["webOrigins"]}')
+                self.log(f'✅ Roles {self.ROLE_NAMES} created successfully')
                 return True
             elif response.status_code == 409:
                 self.log(f"ℹ️  Realm '{self.app_realm}' already exists")
-                return True
+                return None
             else:
                 self.log(f'❌ Failed to create realm: {response.status_code}')
                 return False
@@ -54,44 +94,49 @@ class RealmManager(KeycloakClient):
             self.log(f'❌ Error creating realm: {e}', 'ERROR')
             return False
 
+    def _client_matches(self, existing_client: dict) -> bool:
+        """Whether an existing client already has every configured setting."""
+        for key, value in self.client_data.items():
+            current = existing_client.get(key)
+            if isinstance(value, dict):
+                # Keycloak returns many attributes; only ours need to match
+                if not isinstance(current, dict) or any(
+                    current.get(k) != v for k, v in value.items()
+                ):
+                    return False
+            elif current != value:
+                return False
+        return True
+
     def create_client(self) -> bool:
         """Create or update the spending-monitor client in the realm."""
         try:
-            # Check if client already exists
-            response = self.get(f'/admin/realms/{self.app_realm}/clients')
+            # Check if client already exists (exact clientId match on the server)
+            response = self.get(
+                f'/admin/realms/{self.app_realm}/clients',
+                params={'clientId': self.client_id},
+            )
 
             if response.status_code != 200:
                 self.log(f'❌ Failed to get clients: {response.status_code}')
                 return False
 
-            existing_client = None
-            for client in response.json():
-                if client.get('clientId') == self.client_id:
-                    existing_client = client
-                    break
+            clients = response.json()
+            existing_client = clients[0] if clients else None
 
-            client_data = {
-                'clientId': self.client_id,
-                'name': 'Spending Monitor Frontend',
-                'description': 'Frontend application for spending transaction monitoring',
-                'enabled': True,
-                'publicClient': True,
-                'standardFlowEnabled': True,
-                'directAccessGrantsEnabled': True,
-                'serviceAccountsEnabled': False,
-                'implicitFlowEnabled': False,
-                'redirectUris': self._get_redirect_uris(),
-                'webOrigins': self._get_web_origins(),
-                'attributes': {'pkce.code.challenge.method': 'S256'},
-            }
+            client_data = self.client_data
 
             if existing_client:
+                if self._client_matches(existing_client):
+                    self.log("ℹ️  Client 'spending-monitor' is already up to date")
+                    return True
+
                 # Update existing client
                 client_uuid = existing_client['id']
-                update_data = {**existing_client, **client_data}
+                existing_client.update(client_data)
                 response = self.put(
                     f'/admin/realms/{self.app_realm}/clients/{client_uuid}',
-                    json=update_data,
+                    json=existing_client,
                 )
 
                 if response.status_code == 204:
@@ -120,34 +165,58 @@ class RealmManager(KeycloakClient):
 
     def create_roles(self) -> bool:
         """Create realm roles."""
-        roles = ['user', 'admin']
+        return all(self.map_parallel(self._create_role, self.ROLE_NAMES))
 
-        for role_name in roles:
-            try:
-                role_data = {
-                    'name': role_name,
-                    'description': f'{role_name.capitalize()} role for spending monitor',
-                }
+    def _create_role(self, role_name: str) -> bool:
+        """Create a single realm role, treating an existing role as success."""
+        try:
+            response = self.post(
+                f'/admin/realms/{self.app_realm}/roles', json=self._role_data(role_name)
+            )
 
-                response = self.post(
-                    f'/admin/realms/{self.app_realm}/roles', json=role_data
+            if response.status_code == 201:
+                self.log(f"✅ Role '{role_name}' created successfully")
+            elif response.status_code == 409:
+                self.log(f"ℹ️  Role '{role_name}' already exists")
+            else:
+                self.log(
+                    f"❌ Failed to create role '{role_name}': {response.status_code}"
                 )
+                return False
 
-                if response.status_code == 201:
-                    self.log(f"✅ Role '{role_name}' created successfully")
-                elif response.status_code == 409:
-                    self.log(f"ℹ️  Role '{role_name}' already exists")
-                else:
-                    self.log(
-                        f"❌ Failed to create role '{role_name}': {response.status_code}"
-                    )
-                    return False
+        except Exception as e:
+            self.log(f"❌ Error creating role '{role_name}': {e}", 'ERROR')
+            return False
 
-            except Exception as e:
-                self.log(f"❌ Error creating role '{role_name}': {e}", 'ERROR')
+        return True
+
+    def is_configured(self) -> bool:
+        """Whether the realm already has an up-to-date client and all roles."""
+        try:
+            clients_response, roles_response = self.map_parallel(
+                lambda request: self.get(request[0], params=request[1]),
+                [
+                    (
+                        f'/admin/realms/{self.app_realm}/clients',
+                        {'clientId': self.client_id},
+                    ),
+                    (f'/admin/realms/{self.app_realm}/roles', None),
+                ],
+            )
+            # 404 when the realm does not exist yet
+            if clients_response.status_code != 200 or roles_response.status_code != 200:
                 return False
 
-        return True
+            clients = clients_response.json()
+            role_names = {role['name'] for role in roles_response.json()}
+            return (
+                bool(clients)
+                and self._client_matches(clients[0])
+                and role_names.issuperset(self.ROLE_NAMES)
+            )
+
+        except Exception:
+            return False
 
     def setup(self) -> bool:
         """Complete realm setup."""
@@ -157,15 +226,17 @@ class RealmManager(KeycloakClient):
         if not self.get_admin_token():
             return False
 
-        if not self.create_realm():
-            return False
-
-        time.sleep(1)  # Brief pause for realm to be ready
+        if self.is_configured():
+            self.log(f"ℹ️  Realm '{self.app_realm}' is already configured")
+            self.log('=' * 50)
+            return True
 
-        if not self.create_client():
+        created = self.create_realm()
+        if created is False:
             return False
 
-        if not self.create_roles():
+        # An existing realm keeps its client and roles in sync individually
+        if created is None and not (self.create_client() and self.create_roles()):
             return False
 
         self.log('=' * 50)
@@ -0,0 +1,44 @@
+"""
+Tests for the Keycloak CLI readiness probe
+"""
+
+import socket
+import sys
+import time
+from pathlib import Path
+
+# Add auth package sources to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from keycloak.cli import wait_for_keycloak  # noqa: E402
+
+
+def _closed_port() -> int:
+    """A local port with nothing listening on it"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class TestWaitForKeycloak:
+    """Test suite for wait_for_keycloak"""
+
+    def test_gives_up_within_max_wait(self, monkeypatch):
+        """Test that an unreachable server fails once max_wait_seconds passes"""
+        monkeypatch.setenv('KEYCLOAK_URL', f'http://127.0.0.1:{_closed_port()}')
+        monkeypatch.delenv('KEYCLOAK_PROBE_URLS', raising=False)
+
+        started = time.monotonic()
+        assert wait_for_keycloak(max_wait_seconds=0.5, base_delay=0.05) == 1
+        assert time.monotonic() - started < 1.5
+
+    def test_ready_when_any_probe_url_answers(self, monkeypatch):
+        """Test that one listening endpoint in KEYCLOAK_PROBE_URLS is enough"""
+        with socket.create_server(('127.0.0.1', 0)) as listener:
+            port = listener.getsockname()[1]
+            monkeypatch.setenv(
+                'KEYCLOAK_PROBE_URLS',
+                f'http://127.0.0.1:{_closed_port()}, http://127.0.0.1:{port}',
+            )
+
+            assert wait_for_keycloak(max_wait_seconds=2) == 0
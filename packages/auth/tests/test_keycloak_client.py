@@ -0,0 +1,276 @@
+"""
+Tests for the Keycloak admin client and user manager
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import MagicMock, Mock
+
+import pytest
+
+# Add auth package sources to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from keycloak import client as client_module  # noqa: E402
+from keycloak.client import KeycloakClient  # noqa: E402
+from keycloak.users import UserManager  # noqa: E402
+
+
+def _response(status_code: int = 200, json_data=None) -> Mock:
+    """Mock requests.Response with a status code and JSON body"""
+    response = Mock(status_code=status_code)
+    response.json.return_value = json_data
+    return response
+
+
+def _token_response(access_token: str, refresh_token: str | None = None) -> Mock:
+    """Mock token endpoint response"""
+    return _response(
+        json_data={
+            'access_token': access_token,
+            'expires_in': 300,
+            'refresh_token': refresh_token,
+            'refresh_expires_in': 1800 if refresh_token else 0,
+        }
+    )
+
+
+@pytest.fixture(autouse=True)
+def keycloak_env(monkeypatch):
+    """Point clients at a fake server with the token disk cache disabled"""
+    monkeypatch.setenv('KEYCLOAK_URL', 'http://keycloak.test')
+    monkeypatch.delenv('KEYCLOAK_TOTAL_DEADLINE', raising=False)
+    monkeypatch.setattr(client_module, 'TOKEN_CACHE_PATH', None)
+
+
+@pytest.fixture
+def client():
+    """KeycloakClient with a mocked HTTP session"""
+    kc = KeycloakClient()
+    kc.session = MagicMock(headers={})
+    return kc
+
+
+@pytest.fixture
+def user_manager():
+    """UserManager with a mocked HTTP session and a valid token"""
+    manager = UserManager()
+    manager.session = MagicMock(headers={})
+    manager.access_token = 'token'
+    manager._token.expiry = time.time() + 600
+    return manager
+
+
+class TestAdminToken:
+    """Test suite for admin token handling"""
+
+    def test_expired_token_is_refreshed(self, client):
+        """Test that an expired token is renewed with the refresh_token grant"""
+        client.access_token = 'old'
+        client._token.expiry = time.time() - 1
+        client._token.refresh_token = 'refresh'
+        client._token.refresh_expiry = time.time() + 600
+        client.session.post.return_value = _token_response('new', 'refresh-2')
+        client.session.request.return_value = _response()
+
+        client.get('/admin/realms')
+
+        data = client.session.post.call_args.kwargs['data']
+        assert data['grant_type'] == 'refresh_token'
+        assert data['refresh_token'] == 'refresh'
+        assert client.session.headers['Authorization'] == 'Bearer new'
+        assert client._token.refresh_token == 'refresh-2'
+        assert client._token.expiry > time.time()
+
+    def test_valid_token_is_reused(self, client):
+        """Test that an unexpired token does not trigger a token request"""
+        client.access_token = 'current'
+        client._token.expiry = time.time() + 600
+
+        assert client.get_admin_token() is True
+        client.session.post.assert_not_called()
+
+    def test_shared_clients_see_renewed_token(self, client):
+        """Test that a client built from another shares its token state"""
+        client.access_token = 'old'
+        client._token.expiry = time.time() + 600
+        other = KeycloakClient(client)
+        client.session.post.return_value = _token_response('new')
+
+        client._renew_rejected_token('old')
+        other._renew_rejected_token('old')
+
+        assert other.access_token == 'new'
+        assert client.session.post.call_count == 1
+
+    def test_token_cache_is_opt_in(self, client, tmp_path, monkeypatch):
+        """Test that tokens are written to disk only when a cache path is set"""
+        client.session.post.return_value = _token_response('cached')
+        assert client.get_admin_token() is True
+        assert list(tmp_path.iterdir()) == []
+
+        cache_path = tmp_path / 'token.json'
+        monkeypatch.setattr(client_module, 'TOKEN_CACHE_PATH', cache_path)
+        assert client.get_admin_token(reuse_token=False) is True
+        assert cache_path.stat().st_mode & 0o777 == 0o600
+
+        fresh = KeycloakClient()
+        fresh.session = MagicMock(headers={})
+        assert fresh.get_admin_token() is True
+        assert fresh.access_token == 'cached'
+        fresh.session.post.assert_not_called()
+
+
+class TestRequestRetries:
+    """Test suite for request retry behavior"""
+
+    def test_rejected_token_is_renewed_once(self, client):
+        """Test that a 401 renews the token and retries the request once"""
+        client.access_token = 'revoked'
+        client._token.expiry = time.time() + 600
+        client.session.post.return_value = _token_response('fresh')
+        client.session.request.side_effect = [_response(401), _response(200)]
+
+        response = client.get('/admin/realms/spending-monitor')
+
+        assert response.status_code == 200
+        assert client.session.request.call_count == 2
+        assert client.session.post.call_count == 1
+        assert client.access_token == 'fresh'
+
+    def test_persistent_401_is_returned_after_one_retry(self, client):
+        """Test that a second 401 is returned instead of retried again"""
+        client.access_token = 'revoked'
+        client._token.expiry = time.time() + 600
+        client.session.post.return_value = _token_response('fresh')
+        client.session.request.side_effect = [_response(401), _response(401)]
+
+        assert client.get('/admin/realms').status_code == 401
+        assert client.session.request.call_count == 2
+
+    def test_server_errors_retried_then_returned(self, monkeypatch):
+        """Test that 503s are retried for GET only and then returned, not raised"""
+        hits = {'GET': 0, 'POST': 0}
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _reply(self, method):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if 'token' in self.path:
+                    status, body = 200, {'access_token': 'token', 'expires_in': 60}
+                else:
+                    hits[method] += 1
+                    status, body = 503, {}
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._reply('GET')
+
+            def do_POST(self):
+                self._reply('POST')
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        monkeypatch.setenv('KEYCLOAK_URL', f'http://127.0.0.1:{server.server_port}')
+        monkeypatch.setattr(
+            client_module,
+            'RETRY_POLICY',
+            client_module.RETRY_POLICY.new(backoff_factor=0),
+        )
+
+        try:
+            with UserManager() as manager:
+                assert manager.get_admin_token() is True
+                assert manager.get('/admin/realms').status_code == 503
+                assert manager.bulk_import([{'username': 'u1'}]) is False
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert hits == {'GET': 4, 'POST': 1}
+
+
+class TestUserManager:
+    """Test suite for paginated listings and bulk import"""
+
+    def test_pagination_stops_on_short_page(self, user_manager):
+        """Test that paging continues until a page smaller than page_size"""
+        users = [{'id': f'u{i}'} for i in range(5)]
+        user_manager.session.request.side_effect = [
+            _response(json_data=users[0:2]),
+            _response(json_data=users[2:4]),
+            _response(json_data=users[4:5]),
+        ]
+
+        assert list(user_manager.iter_users(page_size=2)) == users
+
+        firsts = [
+            call.kwargs['params']['first']
+            for call in user_manager.session.request.call_args_list
+        ]
+        assert firsts == [0, 2, 4]
+
+    def test_pagination_stops_on_empty_page(self, user_manager):
+        """Test that an exact multiple of page_size ends on an empty page"""
+        user_manager.session.request.side_effect = [
+            _response(json_data=[{'id': 'u0'}, {'id': 'u1'}]),
+            _response(json_data=[]),
+        ]
+
+        assert len(list(user_manager.iter_users(page_size=2))) == 2
+        assert user_manager.session.request.call_count == 2
+
+    def test_bulk_import_reports_skipped_users(self, user_manager, capsys):
+        """Test that partialImport skips existing users and logs both counts"""
+        user_manager.session.request.return_value = _response(
+            json_data={'added': 1, 'skipped': 2}
+        )
+
+        assert user_manager.bulk_import([{'username': 'u1'}]) is True
+
+        call = user_manager.session.request.call_args
+        assert call.args[0] == 'POST'
+        assert call.args[1].endswith('/partialImport')
+        assert json.loads(call.kwargs['data']) == {
+            'ifResourceExists': 'SKIP',
+            'users': [{'username': 'u1'}],
+        }
+        assert '1 created, 2 already existed' in capsys.readouterr().out
+
+    def test_role_names_by_user_skips_system_roles(self, user_manager):
+        """Test that role members are grouped per user without built-in roles"""
+        members = {
+            'user': [{'id': 'u1'}, {'id': 'u2'}],
+            'admin': [{'id': 'u2'}],
+        }
+
+        def request(method, url, **kwargs):
+            if url.endswith('/roles'):
+                return _response(
+                    json_data=[
+                        {'name': 'user'},
+                        {'name': 'admin'},
+                        {'name': 'offline_access'},
+                    ]
+                )
+            role = url.split('/roles/')[1].split('/')[0]
+            return _response(json_data=members[role])
+
+        user_manager.session.request.side_effect = request
+
+        assert dict(user_manager._role_names_by_user()) == {
+            'u1': ['user'],
+            'u2': ['user', 'admin'],
+        }
@@ -1,27 +1,37 @@
 import argparse
 import asyncio
+import functools
+import importlib.util
 import json
 import os
 import sys
+import time
 import uuid
+from collections import defaultdict
 from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from enum import Enum
+from pathlib import Path
 from typing import Any
 
 # Add the parent directory to sys.path to make imports work when run as script
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from sqlalchemy import func, select, text
+from sqlalchemy import DateTime, Float, Numeric, func, insert, select, text
+from sqlalchemy import Enum as SAEnum
 
 from db.database import SessionLocal
 from db.models import AlertNotification, AlertRule, CreditCard, Transaction, User
 
-# Optional: Import requests for Keycloak API calls
+# Optional: orjson parses large fixtures faster than the stdlib json module
 try:
-    import requests
-
-    REQUESTS_AVAILABLE = True
+    import orjson
 except ImportError:
-    REQUESTS_AVAILABLE = False
+    orjson = None
+
+# Optional: requests for Keycloak API calls, imported on first use
+REQUESTS_AVAILABLE = importlib.util.find_spec('requests') is not None
+if not REQUESTS_AVAILABLE:
     print(
         "⚠️  'requests' library not available. Keycloak user creation will be skipped."
     )
@@ -32,12 +42,44 @@ KEYCLOAK_REALM = os.getenv('KEYCLOAK_REALM', 'spending-monitor')
 KEYCLOAK_ADMIN = os.getenv('KEYCLOAK_ADMIN', 'admin')
 KEYCLOAK_ADMIN_PASSWORD = os.getenv('KEYCLOAK_ADMIN_PASSWORD', 'admin')
 
+# Admin token reused across Keycloak calls until shortly before it expires
+_admin_token_cache: dict[str, Any] = {'token': None, 'expires_at': 0.0}
+
+# Transactions sent per INSERT statement when seeding large fixtures
+TRANSACTION_BATCH_SIZE = 5000
+
+# Bulk INSERT statements, built once and reused for every batch
+_USER_INSERT = insert(User)
+_CARD_INSERT = insert(CreditCard)
+_TRANSACTION_INSERT = insert(Transaction)
+
+
+@functools.cache
+def _kc_session():
+    """One pooled keep-alive session shared by every Keycloak call"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import Retry
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=50,
+        max_retries=Retry(total=2, backoff_factor=0.1),
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
 
 def get_keycloak_admin_token() -> str | None:
-    """Get admin access token from Keycloak"""
+    """Get admin access token from Keycloak, reusing a cached unexpired token"""
     if not REQUESTS_AVAILABLE:
         return None
 
+    if time.monotonic() < _admin_token_cache['expires_at']:
+        return _admin_token_cache['token']
+
     try:
         url = f'{KEYCLOAK_URL}/realms/master/protocol/openid-connect/token'
         data = {
@@ -47,19 +89,26 @@ def get_keycloak_admin_token() -> str | None:
             'client_id': 'admin-cli',
         }
 
-        response = requests.post(url, data=data, timeout=5)
+        response = _kc_session().post(url, data=data, timeout=5)
         response.raise_for_status()
-        return response.json().get('access_token')
+        token_data = response.json()
+        token = token_data.get('access_token')
+        if token:
+            _admin_token_cache['token'] = token
+            _admin_token_cache['expires_at'] = (
+                time.monotonic() + token_data.get('expires_in', 60) - 5
+            )
+        return token
     except Exception as e:
         print(f'⚠️  Could not get Keycloak admin token: {e}')
         return None
 
 
-def create_keycloak_user(
-    email: str, first_name: str, last_name: str, password: str = 'password'
+def sync_users_to_keycloak(
+    users: list[dict[str, Any]], password: str = 'password'
 ) -> bool:
-    """Create or update a user in Keycloak"""
-    if not REQUESTS_AVAILABLE:
+    """Create seeded users in Keycloak with one partial import, skipping existing ones"""
+    if not REQUESTS_AVAILABLE or not users:
         return False
 
     token = get_keycloak_admin_token()
@@ -71,62 +120,44 @@ def create_keycloak_user(
             'Authorization': f'Bearer {token}',
             'Content-Type': 'application/json',
         }
-
-        # Check if user exists
-        users_url = f'{KEYCLOAK_URL}/admin/realms/{KEYCLOAK_REALM}/users'
-        check_url = f'{users_url}?email={email}'
-        response = requests.get(check_url, headers=headers, timeout=5)
-
-        if response.status_code == 200 and len(response.json()) > 0:
-            print(f"   ℹ️  Keycloak user '{email}' already exists")
-            return True
-
-        # Extract username from email
-        username = email.split('@')[0]
-
-        # Create new user
-        user_data = {
-            'username': username,
-            'email': email,
-            'firstName': first_name,
-            'lastName': last_name,
-            'enabled': True,
-            'emailVerified': True,
-            'credentials': [
-                {'type': 'password', 'value': password, 'temporary': False}
+        payload = {
+            'ifResourceExists': 'SKIP',
+            'users': [
+                {
+                    # Extract username from email
+                    'username': user['email'].split('@')[0],
+                    'email': user['email'],
+                    'firstName': user.get('first_name') or '',
+                    'lastName': user.get('last_name') or '',
+                    'enabled': True,
+                    'emailVerified': True,
+                    'credentials': [
+                        {'type': 'password', 'value': password, 'temporary': False}
+                    ],
+                    'realmRoles': ['user'],
+                }
+                for user in users
             ],
         }
 
-        response = requests.post(users_url, json=user_data, headers=headers, timeout=5)
-
-        if response.status_code == 201:
-            print(f"   ✅ Created Keycloak user '{email}' (password: {password})")
-
-            # Assign 'user' role
-            user_id = response.headers.get('Location', '').split('/')[-1]
-            if user_id:
-                role_url = f'{KEYCLOAK_URL}/admin/realms/{KEYCLOAK_REALM}/roles/user'
-                role_response = requests.get(role_url, headers=headers, timeout=5)
-                if role_response.status_code == 200:
-                    role_data = role_response.json()
-                    assign_url = f'{KEYCLOAK_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}/role-mappings/realm'
-                    requests.post(
-                        assign_url, json=[role_data], headers=headers, timeout=5
-                    )
-                    print(f"   ✅ Assigned 'user' role to '{email}'")
+        import_url = f'{KEYCLOAK_URL}/admin/realms/{KEYCLOAK_REALM}/partialImport'
+        response = _kc_session().post(
+            import_url, json=payload, headers=headers, timeout=30
+        )
 
-            return True
-        elif response.status_code == 409:
-            print(f"   ℹ️  Keycloak user '{email}' already exists")
-            return True
-        else:
-            print(
-                f"   ⚠️  Failed to create Keycloak user '{email}': {response.status_code}"
-            )
+        if response.status_code != 200:
+            print(f'   ⚠️  Failed to import Keycloak users: {response.status_code}')
             return False
 
+        result = response.json()
+        print(
+            f'   ✅ Keycloak users: {result.get("added", 0)} created '
+            f'(password: {password}), {result.get("skipped", 0)} already existed'
+        )
+        return True
+
     except Exception as e:
-        print(f'   ⚠️  Error creating Keycloak user: {e}')
+        print(f'   ⚠️  Error importing Keycloak users: {e}')
         return False
 
 
@@ -177,7 +208,7 @@ async def reset_database(session) -> None:
                 transactions,
                 credit_cards,
                 users
-            CASCADE
+            RESTART IDENTITY CASCADE
             """
             )
         )
@@ -218,18 +249,88 @@ def normalize_json_structure(data: dict[str, Any]) -> dict[str, list[dict[str, A
 
 
 def convert_timestamps(obj_data: dict[str, Any], fields: list[str]) -> dict[str, Any]:
-    """Convert string timestamps to datetime objects"""
-    obj_copy = obj_data.copy()
+    """Convert JSON timestamp strings to datetime objects in place"""
     for field in fields:
-        if obj_copy.get(field) and isinstance(obj_copy[field], str):
-            # Remove Z and parse ISO format
-            timestamp_str = obj_copy[field].replace('Z', '+00:00')
-            obj_copy[field] = datetime.fromisoformat(timestamp_str)
-        # If it's already a datetime object, leave it as is
-    return obj_copy
+        # fromisoformat accepts the 'Z' suffix natively on Python 3.11+
+        if value := obj_data.get(field):
+            obj_data[field] = datetime.fromisoformat(value)
+    return obj_data
+
+
+def group_by_columns(
+    rows: list[dict[str, Any]],
+) -> dict[tuple[str, ...], list[dict[str, Any]]]:
+    """Group fixture rows by their key set, preserving order within each group"""
+    # Rows missing a column must not get NULL in place of its server default,
+    # and a bulk insert takes its column list from the first row only, so each
+    # distinct set of fixture keys is written as its own batch
+    groups = defaultdict(list)
+    for row in rows:
+        groups[tuple(row)].append(row)
+    return groups
+
+
+async def insert_rows(session, statement, rows: list[dict[str, Any]]) -> None:
+    """Bulk insert rows, one executemany per distinct set of fixture keys"""
+    for group in group_by_columns(rows).values():
+        await session.execute(statement, group)
+
+
+def copy_value(column, value: Any) -> Any:
+    """
+    Coerce a fixture value to what asyncpg's binary COPY expects for column.
+
+    COPY skips SQLAlchemy's type processing, so JSON floats headed for NUMERIC
+    become Decimal, enum members or names become validated enum names, and
+    naive timestamps are taken as UTC.
+    """
+    if value is None:
+        return None
+
+    column_type = column.type
+    if isinstance(column_type, SAEnum):
+        name = value.name if isinstance(value, Enum) else value
+        if name not in column_type.enum_class.__members__:
+            raise ValueError(f'Invalid {column.name} value for COPY: {value!r}')
+        return name
+    if isinstance(column_type, Float):
+        return float(value)
+    if isinstance(column_type, Numeric):
+        # str() keeps the fixture's decimal digits instead of binary float noise
+        return Decimal(str(value))
+    if isinstance(column_type, DateTime):
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return value if value.tzinfo else value.replace(tzinfo=UTC)
+    return value
+
+
+async def copy_transactions(session, transactions: list[dict[str, Any]]) -> None:
+    """Load transactions with PostgreSQL COPY (requires the asyncpg driver)"""
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+
+    table_columns = Transaction.__table__.columns
+    for columns, rows in group_by_columns(transactions).items():
+        copy_columns = [table_columns[name] for name in columns]
+        await raw_connection.driver_connection.copy_records_to_table(
+            Transaction.__tablename__,
+            records=[
+                tuple(
+                    copy_value(column, value)
+                    for column, value in zip(copy_columns, row.values(), strict=True)
+                )
+                for row in rows
+            ],
+            columns=list(columns),
+        )
 
 
-async def seed_from_json(json_file_path: str) -> None:
+async def seed_from_json(
+    json_file_path: str,
+    batch_size: int = TRANSACTION_BATCH_SIZE,
+    use_copy: bool = False,
+) -> None:
     """Seed database with data from JSON file"""
 
     # Validate file exists
@@ -237,8 +338,9 @@ async def seed_from_json(json_file_path: str) -> None:
         raise FileNotFoundError(f'JSON file not found: {json_file_path}')
 
     print(f'📂 Loading fixture from: {json_file_path}')
-    with open(json_file_path) as f:
-        fixture_data = json.load(f)
+    # Read the whole file in one call and parse the bytes directly
+    raw_fixture = Path(json_file_path).read_bytes()
+    fixture_data = orjson.loads(raw_fixture) if orjson else json.loads(raw_fixture)
 
     # Normalize JSON structure
     fixture = normalize_json_structure(fixture_data)
@@ -249,10 +351,13 @@ async def seed_from_json(json_file_path: str) -> None:
             await reset_database(session)
 
             print(f'\n🔄 Starting seeding from {os.path.basename(json_file_path)}...')
+            seed_started = time.perf_counter()
+            keycloak_task = None
 
             # --- Insert Users ---
-            for user_data in fixture['users']:
-                user_data_copy = convert_timestamps(
+            # Tables were just truncated, so rows are inserted in bulk, not merged
+            users_batch = [
+                convert_timestamps(
                     user_data,
                     [
                         'created_at',
@@ -261,75 +366,57 @@ async def seed_from_json(json_file_path: str) -> None:
                         'last_transaction_timestamp',
                     ],
                 )
-
-                user = User(**user_data_copy)
-                await session.merge(user)
-                print(f'👤 Seeded User: {user.first_name} {user.last_name}')
-
-                # Also create user in Keycloak for authentication
-                if REQUESTS_AVAILABLE and user.email:
-                    print(f'🔐 Creating Keycloak user for: {user.email}')
-                    create_keycloak_user(
-                        email=user.email,
-                        first_name=user.first_name or '',
-                        last_name=user.last_name or '',
-                        password='password',  # Default password for test users
+                for user_data in fixture['users']
+            ]
+
+            if users_batch:
+                await insert_rows(session, _USER_INSERT, users_batch)
+                print(f'👤 Seeded {len(users_batch)} user(s)')
+
+                # Also create the users in Keycloak for authentication; the HTTP
+                # call runs on a worker thread while the remaining inserts proceed
+                keycloak_users = [user for user in users_batch if user.get('email')]
+                if REQUESTS_AVAILABLE and keycloak_users:
+                    print(f'🔐 Creating {len(keycloak_users)} Keycloak user(s)')
+                    keycloak_task = asyncio.create_task(
+                        asyncio.to_thread(sync_users_to_keycloak, keycloak_users)
                     )
 
             # --- Insert Credit Cards ---
-            for card_data in fixture['credit_cards']:
-                card_data_copy = convert_timestamps(
-                    card_data, ['created_at', 'updated_at']
-                )
-
-                card = CreditCard(**card_data_copy)
-                await session.merge(card)
-                print(f'💳 Seeded Credit Card: ****{card.card_number[-4:]}')
+            cards_batch = [
+                convert_timestamps(card_data, ['created_at', 'updated_at'])
+                for card_data in fixture['credit_cards']
+            ]
+            if cards_batch:
+                await insert_rows(session, _CARD_INSERT, cards_batch)
+                print(f'💳 Seeded {len(cards_batch)} credit card(s)')
 
             # --- Insert Transactions (with dynamic dates) ---
             if fixture['transactions']:
+                # pandas is only needed here; importing it lazily keeps startup fast
+                import pandas as pd
+
                 now = datetime.now(UTC)  # Use timezone-aware datetime
                 print(f'\n⏰ Current time: {now}')
                 print(f'📊 Processing {len(fixture["transactions"])} transactions...')
 
-                # Calculate time offset based on first transaction
-                time_offset = None
-                first_transaction = fixture['transactions'][0]
-
-                # Parse the first transaction date to calculate offset
-                if 'transaction_date' in first_transaction:
-                    original_date_str = first_transaction['transaction_date']
-                    print(f'🔍 First transaction date from JSON: {original_date_str}')
-
-                    # Parse the original date
-                    if isinstance(original_date_str, str):
-                        # Handle ISO format with 'Z' timezone
-                        date_str_clean = original_date_str.replace('Z', '+00:00')
-                        try:
-                            original_date = datetime.fromisoformat(date_str_clean)
-                        except ValueError:
-                            # Fallback parsing - assume UTC if no timezone
-                            try:
-                                original_date = datetime.fromisoformat(
-                                    original_date_str
-                                )
-                                if original_date.tzinfo is None:
-                                    original_date = original_date.replace(tzinfo=UTC)
-                            except ValueError:
-                                # Last resort - parse as naive and assume UTC
-                                original_date = datetime.strptime(
-                                    original_date_str, '%Y-%m-%dT%H:%M:%S'
-                                )
-                                original_date = original_date.replace(tzinfo=UTC)
-                    else:
-                        original_date = original_date_str
-                        if original_date.tzinfo is None:
-                            original_date = original_date.replace(tzinfo=UTC)
+                # Parse every transaction date at once (missing dates become NaT)
+                transactions = fixture['transactions']
+                dates = pd.to_datetime(
+                    [txn.get('transaction_date') for txn in transactions],
+                    utc=True,
+                    format='ISO8601',
+                )
 
+                # Calculate time offset based on first transaction
+                if pd.notna(dates[0]):
+                    print(
+                        f'🔍 First transaction date from JSON: {transactions[0]["transaction_date"]}'
+                    )
                     # Calculate the time difference to bring transactions to "now"
-                    time_offset = now - original_date
+                    time_offset = now - dates[0]
                     print(
-                        f'🔍 Time offset calculated: {time_offset} (bringing {original_date} to ~{now})'
+                        f'🔍 Time offset calculated: {time_offset} (bringing {dates[0]} to ~{now})'
                     )
                 else:
                     print(
@@ -337,110 +424,81 @@ async def seed_from_json(json_file_path: str) -> None:
                     )
                     time_offset = timedelta(0)
 
-                for i, txn_data in enumerate(fixture['transactions']):
-                    print(
-                        f'\n🔍 Processing transaction {i}: {txn_data.get("trans_num", "Unknown")}'
-                    )
-                    txn_data_copy = txn_data.copy()
+                # Apply the time offset to maintain relative timing
+                new_dates = (dates + time_offset).to_pydatetime()
 
+                # Fixture dicts are discarded after insert, so update them in place
+                for i, (txn_data, txn_date) in enumerate(
+                    zip(transactions, new_dates, strict=True)
+                ):
                     # Generate new UUID
-                    txn_data_copy['id'] = str(uuid.uuid4())
-
-                    # Apply intelligent date transformation
-                    if 'transaction_date' in txn_data_copy and time_offset is not None:
-                        original_txn_date_str = txn_data_copy['transaction_date']
-                        print(f'🔍 Original transaction date: {original_txn_date_str}')
-
-                        # Parse the original transaction date
-                        if isinstance(original_txn_date_str, str):
-                            date_str_clean = original_txn_date_str.replace(
-                                'Z', '+00:00'
-                            )
-                            try:
-                                original_txn_date = datetime.fromisoformat(
-                                    date_str_clean
-                                )
-                            except ValueError:
-                                # Fallback parsing - assume UTC if no timezone
-                                try:
-                                    original_txn_date = datetime.fromisoformat(
-                                        original_txn_date_str
-                                    )
-                                    if original_txn_date.tzinfo is None:
-                                        original_txn_date = original_txn_date.replace(
-                                            tzinfo=UTC
-                                        )
-                                except ValueError:
-                                    # Last resort - parse as naive and assume UTC
-                                    original_txn_date = datetime.strptime(
-                                        original_txn_date_str, '%Y-%m-%dT%H:%M:%S'
-                                    )
-                                    original_txn_date = original_txn_date.replace(
-                                        tzinfo=UTC
-                                    )
-                        else:
-                            original_txn_date = original_txn_date_str
-                            if original_txn_date.tzinfo is None:
-                                original_txn_date = original_txn_date.replace(
-                                    tzinfo=UTC
-                                )
-
-                        # Apply the time offset to maintain relative timing
-                        new_txn_date = original_txn_date + time_offset
-                        txn_data_copy['transaction_date'] = new_txn_date
+                    txn_data['id'] = str(uuid.uuid4())
 
-                        print(
-                            f'🔍 Adjusted transaction date: {original_txn_date} + {time_offset} = {new_txn_date}'
-                        )
-                    else:
+                    if pd.isna(txn_date):
                         # Fallback to old logic if no transaction_date
-                        minutes_offset = 5 * i
-                        txn_data_copy['transaction_date'] = now - timedelta(
-                            minutes=minutes_offset
-                        )
-                        print(
-                            f'🔍 Fallback: transaction date set to: {txn_data_copy["transaction_date"]}'
-                        )
+                        txn_date = now - timedelta(minutes=5 * i)
 
                     # Set created_at and updated_at to match transaction_date
-                    txn_data_copy['created_at'] = txn_data_copy['transaction_date']
-                    txn_data_copy['updated_at'] = txn_data_copy['transaction_date']
-
-                    # Convert any remaining string timestamps
-                    txn_data_copy = convert_timestamps(
-                        txn_data_copy, ['transaction_date', 'created_at', 'updated_at']
-                    )
+                    txn_data['transaction_date'] = txn_date
+                    txn_data['created_at'] = txn_date
+                    txn_data['updated_at'] = txn_date
 
-                    try:
-                        txn = Transaction(**txn_data_copy)
-                        await session.merge(txn)
-                        print(
-                            f'💰 Seeded Transaction: {txn.trans_num} - ${txn.amount} at {txn.merchant_name} ({txn.transaction_date})'
-                        )
-                    except Exception as e:
-                        print(f'❌ Failed to create transaction: {e}')
-                        print(f'❌ Transaction data: {txn_data_copy}')
-                        raise
+                if use_copy:
+                    await copy_transactions(session, transactions)
+                else:
+                    # Batches bound statement size; everything commits once below
+                    # so a failed batch rolls back the whole seed
+                    inserted = 0
+                    for group in group_by_columns(transactions).values():
+                        for start in range(0, len(group), batch_size):
+                            batch = group[start : start + batch_size]
+                            await session.execute(_TRANSACTION_INSERT, batch)
+                            inserted += len(batch)
+                            if len(transactions) > batch_size:
+                                print(
+                                    f'   … {inserted}/{len(transactions)} transactions'
+                                )
+                print(f'💰 Seeded {len(transactions)} transaction(s)')
 
             # Commit all changes
             await session.commit()
-            print('\n✅ All data committed to database')
-
-            # Verify insertion
-            user_count = await session.scalar(select(func.count(User.id)))
-            card_count = await session.scalar(select(func.count(CreditCard.id)))
-            txn_count = await session.scalar(select(func.count(Transaction.id)))
-            alert_rule_count = await session.scalar(select(func.count(AlertRule.id)))
-            alert_notif_count = await session.scalar(
-                select(func.count(AlertNotification.id))
+            print(
+                f'\n✅ All data committed to database '
+                f'in {time.perf_counter() - seed_started:.2f}s'
             )
 
+            # Verify insertion (all counts in one round-trip)
+            result = await session.execute(
+                select(
+                    *(
+                        select(func.count(model.id)).scalar_subquery()
+                        for model in (
+                            User,
+                            CreditCard,
+                            Transaction,
+                            AlertRule,
+                            AlertNotification,
+                        )
+                    )
+                )
+            )
+            (
+                user_count,
+                card_count,
+                txn_count,
+                alert_rule_count,
+                alert_notif_count,
+            ) = result.one()
+
             print('\n📈 Final counts:')
             print(f'   • Users: {user_count}')
             print(f'   • Credit Cards: {card_count}')
             print(f'   • Transactions: {txn_count}')
             print(f'   • Alert Rules: {alert_rule_count}')
             print(f'   • Alert Notifications: {alert_notif_count}')
+
+            if keycloak_task is not None:
+                await keycloak_task
             print('\n🎉 Seeding completed successfully!')
 
         except Exception as e:
@@ -470,6 +528,19 @@ Available JSON files in json/ directory:
         help='Path to JSON file containing test data (relative to script directory or absolute path)',
     )
 
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=TRANSACTION_BATCH_SIZE,
+        help=f'Transactions sent per INSERT statement (default: {TRANSACTION_BATCH_SIZE})',
+    )
+
+    parser.add_argument(
+        '--copy',
+        action='store_true',
+        help='Load transactions with PostgreSQL COPY instead of batched INSERTs (asyncpg only)',
+    )
+
     parser.add_argument(
         '--force',
         '-f',
@@ -479,6 +550,9 @@ Available JSON files in json/ directory:
 
     args = parser.parse_args()
 
+    if args.batch_size < 1:
+        parser.error('--batch-size must be at least 1')
+
     # Resolve JSON file path
     if os.path.isabs(args.json_file):
         json_file_path = args.json_file
@@ -495,7 +569,7 @@ Available JSON files in json/ directory:
 
     # Execute seeding
     try:
-        asyncio.run(seed_from_json(json_file_path))
+        asyncio.run(seed_from_json(json_file_path, args.batch_size, args.copy))
     except KeyboardInterrupt:
         print('\n⚠️  Interrupted by user. Exiting...')
     except Exception as e:
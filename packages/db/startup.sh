@@ -90,7 +90,7 @@ if [ "${BYPASS_AUTH:-true}" = "false" ] && [ -n "${KEYCLOAK_URL}" ]; then
     # Wait for Keycloak to be ready using the CLI
     echo ""
     cd /app/packages/auth/src
-    if ! /app/venv/bin/python3 -m keycloak.cli wait --max-attempts 60 --interval 2; then
+    if ! /app/venv/bin/python3 -m keycloak.cli wait --max-wait 120 --deep-check; then
         echo "   ⚠️  Keycloak not ready, skipping setup (non-critical)"
         echo ""
         echo "🎉 Database initialization completed!"
@@ -5,6 +5,7 @@ Database tests
 import pytest
 from sqlalchemy import text
 
+from db.config import settings
 from db.database import engine
 
 
@@ -18,3 +19,10 @@ async def test_database_connection():
     except Exception as e:
         pytest.skip(f'Database connection failed (DB not running): {e}')
         return
+
+
+def test_engine_uses_configured_query_cache_size():
+    """Test that the engine's compiled-statement cache is sized from settings"""
+    compiled_cache = engine.sync_engine._compiled_cache
+
+    assert compiled_cache.capacity == settings.DB_QUERY_CACHE_SIZE
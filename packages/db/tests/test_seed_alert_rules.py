@@ -0,0 +1,74 @@
+"""
+Seed script tests
+"""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from db.models import Transaction, TransactionStatus, TransactionType
+from db.scripts import seed_alert_rules
+
+FIXTURE = (
+    Path(seed_alert_rules.__file__).parent / 'json' / 'alert_over_500_transaction.json'
+)
+
+
+@pytest.mark.asyncio
+async def test_copy_seeds_fixture_with_database_types():
+    """Test that --copy sends NUMERIC, enum and timestamp values COPY can encode"""
+    raw_connection = MagicMock()
+    raw_connection.driver_connection.copy_records_to_table = AsyncMock()
+    connection = AsyncMock()
+    connection.get_raw_connection.return_value = raw_connection
+
+    session = AsyncMock()
+    session.connection.return_value = connection
+    session.execute.return_value = MagicMock(**{'one.return_value': (0,) * 5})
+    session_factory = MagicMock()
+    session_factory.return_value.__aenter__.return_value = session
+
+    with (
+        patch.object(seed_alert_rules, 'SessionLocal', session_factory),
+        patch.object(seed_alert_rules, 'reset_database', AsyncMock()),
+        patch.object(seed_alert_rules, 'REQUESTS_AVAILABLE', False),
+    ):
+        await seed_alert_rules.seed_from_json(str(FIXTURE), use_copy=True)
+
+    copy = raw_connection.driver_connection.copy_records_to_table
+    fixture = json.loads(FIXTURE.read_text())['transactions']
+    copied = 0
+    for call in copy.await_args_list:
+        assert call.args == (Transaction.__tablename__,)
+        columns = call.kwargs['columns']
+        for record in call.kwargs['records']:
+            row = dict(zip(columns, record, strict=True))
+            assert isinstance(row['amount'], Decimal)
+            assert row['transaction_type'] in TransactionType.__members__
+            assert row['status'] in TransactionStatus.__members__
+            for name in ('transaction_date', 'created_at', 'updated_at'):
+                assert isinstance(row[name], datetime)
+                assert row[name].tzinfo is not None
+            copied += 1
+
+    assert copied == len(fixture)
+
+
+def test_copy_value_rejects_unknown_enum():
+    """Test that an enum value outside the database type fails before COPY"""
+    column = Transaction.__table__.columns['status']
+
+    assert seed_alert_rules.copy_value(column, TransactionStatus.SETTLED) == 'SETTLED'
+    with pytest.raises(ValueError, match='status'):
+        seed_alert_rules.copy_value(column, 'settled-ish')
+
+
+def test_copy_value_keeps_decimal_digits():
+    """Test that JSON floats for NUMERIC columns become exact decimals"""
+    column = Transaction.__table__.columns['amount']
+
+    assert seed_alert_rules.copy_value(column, 19.99) == Decimal('19.99')